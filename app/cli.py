@@ -0,0 +1,254 @@
+import argparse
+import importlib
+import os
+import sys
+import time
+
+from app.utilities.instrumentation import metrics
+
+# Modules each subcommand needs; they are only imported once the subcommand is known
+SUBCOMMAND_MODULES = {
+    'ingest': ['app.persistence.database'],
+    'clean': ['app.utilities.data_cleaner'],
+    'views': ['app.persistence.data_processor'],
+    'describe': ['app.persistence.data_processor'],
+    'plot': ['app.utilities.data_visualizer'],
+    'export': ['app.persistence.database'],
+    'search': ['app.persistence.database'],
+    'snapshot': ['app.persistence.database'],
+    'restore': ['app.persistence.database'],
+    'related': ['app.persistence.database', 'app.persistence.related'],
+}
+
+
+def run_ingest(args, database):
+    db = database.Database(args.db, args.uri)
+    if args.materialized:
+        db.enable_materialized_aggregates()
+    if args.related:
+        db.enable_related_movies()
+    if args.delta:
+        return db.setup_database_delta(args.csv, 'movies', 'IMDB ID', manifest_path=args.manifest,
+                                       delete_missing=args.delete_missing, chunksize=args.chunksize,
+                                       batch_size=args.batch_size)
+    if args.parallel:
+        return db.setup_database_parallel(args.csv, 'movies', 'IMDB ID', workers=args.parallel,
+                                          chunksize=args.chunksize, batch_size=args.batch_size)
+    return db.setup_database_from_csv(args.csv, collection_name='movies', unique_key='IMDB ID',
+                                      chunksize=args.chunksize, batch_size=args.batch_size)
+
+
+def run_clean(args, data_cleaner):
+    cleaner = data_cleaner.MovieDataCleaner(args.csv, args.uri, args.db)
+    return cleaner.save_cleaned_data(args.output, batch_size=args.batch_size)
+
+
+def run_views(args, data_processor):
+    data_processor.DataProcessor(db_name=args.db, uri=args.uri).create_views(materialized=args.materialized)
+
+
+def run_describe(args, data_processor):
+    processor = data_processor.DataProcessor(db_name=args.db, uri=args.uri)
+    processor.display_data(args.collection, rows=args.rows)
+    processor.describe_data(args.collection)
+
+
+def run_plot(args, data_visualizer):
+    visualizer = data_visualizer.DataVisualizer(args.db, args.uri)
+    if args.show:
+        visualizer.plot_top_5_directors_most_films()
+        visualizer.plot_top_5_directors_rated()
+        visualizer.plot_director_average_runtime()
+        visualizer.plot_top_15_actors_with_movies()
+        return None
+    paths = visualizer.render_all(args.output_dir, formats=args.format, workers=args.workers)
+    for path in paths:
+        print(path)
+    return paths
+
+
+def run_export(args, database):
+    """Stream a collection to CSV or JSON lines one cursor batch at a time."""
+    db = database.Database(args.db, args.uri)
+    rows = 0
+    with open(args.output, 'w', encoding='utf-8', newline='') as file:
+        for batch in db.iter_data(args.collection, batch_size=args.batch_size):
+            batch = batch.drop(columns='_id', errors='ignore')
+            if args.format == 'csv':
+                batch.to_csv(file, header=rows == 0, index=False)
+            elif len(batch):
+                batch.to_json(file, orient='records', lines=True, force_ascii=False)
+                file.write('\n')
+            rows += len(batch)
+    print(f"Exported {rows} documents from {args.collection} to {args.output}")
+    return rows
+
+
+def run_search(args, database):
+    search = database.Database(args.db, args.uri).search(args.collection)
+    projection = {'Title': 1, 'Year': 1, 'Director': 1}
+    if args.person:
+        page = search.people(args.query, limit=args.limit, cursor=args.cursor, projection=projection)
+    else:
+        page = search.text(args.query, limit=args.limit, cursor=args.cursor, projection=projection)
+    for document in page['results']:
+        print(f"{document.get('Title')} ({document.get('Year')}) - {', '.join(document.get('Director') or [])}")
+    if page['next_cursor']:
+        print(f"Next page: --cursor {page['next_cursor']}")
+    return page
+
+
+def run_snapshot(args, database):
+    return database.Database(args.db, args.uri).export_snapshot(
+        args.directory, format=args.format, collections=args.collections, batch_size=args.batch_size,
+        compress=not args.no_compress, compression=args.compression)
+
+
+def run_restore(args, database):
+    return database.Database(args.db, args.uri).restore_snapshot(
+        args.directory, collections=args.collections, workers=args.workers, batch_size=args.batch_size,
+        drop=not args.keep_existing)
+
+
+def run_related(args, database, related):
+    index = related.RelatedMoviesIndex(database.Database(args.db, args.uri).db, k=args.k)
+    if args.build:
+        index.build()
+    for movie in index.related(args.imdb_id) if args.imdb_id else []:
+        print(f"{movie['imdb_id']}  {movie['score']:5.1f}  {movie['title']}")
+
+
+COMMANDS = {
+    'ingest': run_ingest,
+    'clean': run_clean,
+    'views': run_views,
+    'describe': run_describe,
+    'plot': run_plot,
+    'export': run_export,
+    'search': run_search,
+    'snapshot': run_snapshot,
+    'restore': run_restore,
+    'related': run_related,
+}
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='films', description="Movie catalog pipeline, one step per subcommand")
+    parser.add_argument('--db', default='movies', help="Database name")
+    parser.add_argument('--uri', default=None, help="MongoDB URI (defaults to MONGODB_URI)")
+    parser.add_argument('--timings', action='store_true', help="Report startup and run time on stderr")
+    parser.add_argument('--imports-only', action='store_true',
+                        help="Stop after importing the subcommand's modules, to measure startup")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    ingest = subparsers.add_parser('ingest', help="Load a CSV file (or directory of shards) into movies")
+    ingest.add_argument('--csv', default='data/movies.csv')
+    ingest.add_argument('--chunksize', type=int, default=10000)
+    ingest.add_argument('--batch-size', type=int, default=1000)
+    ingest.add_argument('--parallel', type=int, default=0, metavar='N',
+                        help="Ingest with N worker processes; --materialized and --related are rebuilt afterwards")
+    ingest.add_argument('--delta', action='store_true',
+                        help="Only ingest files and rows that changed since the last delta run")
+    ingest.add_argument('--manifest', default=None, help="Manifest of the delta runs (next to the CSV by default)")
+    ingest.add_argument('--delete-missing', action='store_true',
+                        help="With --delta, delete movies whose row disappeared from the CSV")
+    ingest.add_argument('--materialized', action='store_true',
+                        help="Keep the materialized director and actor aggregates up to date")
+    ingest.add_argument('--related', action='store_true',
+                        help="Refresh the related movies of the ingested movies")
+
+    clean = subparsers.add_parser('clean', help="Validate a CSV file and save movies and directors")
+    clean.add_argument('--csv', default='data/movies.csv')
+    clean.add_argument('--output', default='data/movies_cleaned.csv')
+    clean.add_argument('--batch-size', type=int, default=1000)
+
+    views = subparsers.add_parser('views', help="(Re)create the top-N views")
+    views.add_argument('--materialized', action='store_true')
+
+    describe = subparsers.add_parser('describe', help="Print a preview and statistics of a collection")
+    describe.add_argument('--collection', default='movies')
+    describe.add_argument('--rows', type=int, default=5, help="Rows of the preview")
+
+    plot = subparsers.add_parser('plot', help="Render the charts of the views")
+    plot.add_argument('--output-dir', default='charts')
+    plot.add_argument('--format', nargs='+', default=['png'], help="Image formats, e.g. png svg")
+    plot.add_argument('--workers', type=int, default=None)
+    plot.add_argument('--show', action='store_true', help="Show the charts interactively instead")
+
+    export = subparsers.add_parser('export', help="Stream a collection to a file")
+    export.add_argument('--collection', default='movies')
+    export.add_argument('--output', required=True)
+    export.add_argument('--format', choices=['csv', 'jsonl'], default='csv')
+    export.add_argument('--batch-size', type=int, default=1000)
+
+    search = subparsers.add_parser('search', help="Search titles and summaries, or people by name prefix")
+    search.add_argument('query')
+    search.add_argument('--person', action='store_true', help="Match Director and Cast names starting with query")
+    search.add_argument('--collection', default='movies')
+    search.add_argument('--limit', type=int, default=20)
+    search.add_argument('--cursor', default=None, help="Token printed with the previous page")
+
+    snapshot = subparsers.add_parser('snapshot', help="Export movies, directors and the views to a directory")
+    snapshot.add_argument('directory')
+    snapshot.add_argument('--format', choices=['bson', 'parquet'], default='bson')
+    snapshot.add_argument('--collections', nargs='+', default=None)
+    snapshot.add_argument('--batch-size', type=int, default=1000)
+    snapshot.add_argument('--no-compress', action='store_true', help="Write plain .bson instead of .bson.gz")
+    snapshot.add_argument('--compression', default='zstd', help="Parquet compression codec")
+
+    restore = subparsers.add_parser('restore', help="Load a snapshot directory back into the database")
+    restore.add_argument('directory')
+    restore.add_argument('--collections', nargs='+', default=None)
+    restore.add_argument('--workers', type=int, default=4)
+    restore.add_argument('--batch-size', type=int, default=1000)
+    restore.add_argument('--keep-existing', action='store_true', help="Don't drop the collections first")
+
+    related = subparsers.add_parser('related', help="Build the related-movies index or look a movie up")
+    related.add_argument('imdb_id', nargs='?')
+    related.add_argument('--build', action='store_true', help="Recompute the whole index first")
+    related.add_argument('-k', type=int, default=10, help="Related movies kept per movie")
+    return parser
+
+
+def process_age():
+    """Return the seconds since this process started, or None where /proc is unavailable."""
+    try:
+        with open('/proc/self/stat', encoding='ascii') as file:
+            # Fields after the parenthesized command name; starttime is field 22 of the full line
+            fields = file.read().rsplit(')', 1)[1].split()
+        with open('/proc/uptime', encoding='ascii') as file:
+            uptime = float(file.read().split()[0])
+        return uptime - int(fields[19]) / os.sysconf('SC_CLK_TCK')
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def main(argv=None):
+    age = process_age()
+    started = time.perf_counter()
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.command == 'ingest' and args.delta and args.parallel:
+        parser.error("--delta can't be combined with --parallel")
+
+    modules = [importlib.import_module(name) for name in SUBCOMMAND_MODULES[args.command]]
+    imported = time.perf_counter()
+    metrics.observe(f'cli.{args.command}.imports', imported - started)
+
+    if not args.imports_only:
+        COMMANDS[args.command](args, *modules)
+    finished = time.perf_counter()
+    metrics.observe(f'cli.{args.command}.run', finished - imported)
+
+    if args.timings:
+        interpreter = f"{age:.3f}s" if age is not None else "n/a"
+        print(f"[{args.command}] interpreter {interpreter}, imports {imported - started:.3f}s, "
+              f"run {finished - imported:.3f}s, total {finished - started + (age or 0):.3f}s", file=sys.stderr)
+
+    # Write stage timings and counters when FILMS_METRICS_OUTPUT is set
+    metrics.flush()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,137 @@
+from collections import defaultdict
+
+from pymongo import DESCENDING, DeleteMany, UpdateOne
+
+from app.persistence.people import split_people
+
+DIRECTOR_STATS = 'director_stats'
+ACTOR_STATS = 'actor_stats'
+
+# Accumulated fields served through an index, per backing collection
+INDEXED_FIELDS = {
+    DIRECTOR_STATS: ['film_count', 'average_rating', 'average_runtime'],
+    ACTOR_STATS: ['film_count'],
+}
+
+
+def accumulators_exist(collection_names):
+    """Return whether both accumulator collections are among collection_names (views --materialized ran)."""
+    return DIRECTOR_STATS in collection_names and ACTOR_STATS in collection_names
+
+
+def _number(value):
+    """Return value if it is a number, else 0 (mirrors how $sum ignores other types)."""
+    return value if isinstance(value, (int, float)) and not isinstance(value, bool) and value == value else 0
+
+
+class MaterializedAggregates:
+    """Per-director and per-actor accumulators kept in backing collections.
+
+    Each backing document holds film_count, rating_sum and runtime_sum (plus the
+    movie titles for actors) with the derived averages, so top-N reads are served
+    from an index instead of re-grouping the whole movies collection.
+    """
+
+    def __init__(self, db, source='movies'):
+        self.db = db
+        self.source = source
+
+    def rebuild(self):
+        """Recompute every accumulator from the source collection."""
+        accumulators = {
+            "film_count": {"$sum": 1},  # Count the number of films
+            "rating_sum": {"$sum": "$Rating"},
+            "runtime_sum": {"$sum": "$Runtime"},
+        }
+        self.db[self.source].aggregate([
+            {"$unwind": "$Director"},  # Director is stored as an array of names
+            {"$group": {"_id": "$Director", **accumulators}},  # Group by director's name
+            {"$match": {"_id": {"$ne": None}}},
+            {"$set": _averages()},
+            {"$out": DIRECTOR_STATS},
+        ])
+        self.db[self.source].aggregate([
+            {"$project": {"Title": 1, "Rating": 1, "Runtime": 1, "Cast": 1}},
+            {"$unwind": "$Cast"},  # Flatten the pre-split Cast array
+            {"$group": {"_id": "$Cast", "movies": {"$push": "$Title"}, **accumulators}},  # Group by actor's name
+            {"$set": _averages()},
+            {"$out": ACTOR_STATS},
+        ])
+        self.ensure_indexes()
+        print("Materialized aggregates rebuilt.")
+
+    def ensure_indexes(self):
+        """Create the descending indexes the top-N reads sort on."""
+        for collection_name, fields in INDEXED_FIELDS.items():
+            for field in fields:
+                self.db[collection_name].create_index([(field, DESCENDING)])
+
+    def on_change(self, collection_name, added, removed):
+        """Fold the movies added to and removed from the source collection into the accumulators."""
+        if collection_name != self.source or not (added or removed):
+            return
+
+        director_deltas = defaultdict(_new_delta)
+        actor_deltas = defaultdict(_new_delta)
+        for movies, sign in ((added, 1), (removed, -1)):
+            for movie in movies:
+                for director in split_people(movie.get('Director')):
+                    _accumulate(director_deltas[director], movie, sign)
+                for actor in split_people(movie.get('Cast')):
+                    _accumulate(actor_deltas[actor], movie, sign, with_title=True)
+
+        self._apply(DIRECTOR_STATS, director_deltas)
+        self._apply(ACTOR_STATS, actor_deltas)
+
+    def top(self, collection_name, field, n):
+        """Return the n backing documents with the highest value of field."""
+        return list(self.db[collection_name].find().sort(field, DESCENDING).limit(n))
+
+    def _apply(self, collection_name, deltas):
+        """Write the deltas with one pipeline upsert per key in a single bulk write."""
+        if not deltas:
+            return
+        requests = []
+        for key, delta in deltas.items():
+            counters = {
+                field: {"$add": [{"$ifNull": [f"${field}", 0]}, delta[field]]}
+                for field in ('film_count', 'rating_sum', 'runtime_sum')
+            }
+            if collection_name == ACTOR_STATS:
+                kept = {
+                    "$filter": {
+                        "input": {"$ifNull": ["$movies", []]},
+                        "cond": {"$not": [{"$in": ["$$this", delta['removed_titles']]}]}
+                    }
+                }
+                counters['movies'] = {"$concatArrays": [kept, delta['added_titles']]}
+            requests.append(UpdateOne({'_id': key}, [{"$set": counters}, {"$set": _averages()}], upsert=True))
+        # Keys whose last movie went away are dropped
+        requests.append(DeleteMany({'_id': {'$in': list(deltas)}, 'film_count': {'$lte': 0}}))
+        self.db[collection_name].bulk_write(requests, ordered=True)
+
+
+def _new_delta():
+    return {'film_count': 0, 'rating_sum': 0, 'runtime_sum': 0, 'added_titles': [], 'removed_titles': []}
+
+
+def _accumulate(delta, movie, sign, with_title=False):
+    delta['film_count'] += sign
+    delta['rating_sum'] += sign * _number(movie.get('Rating'))
+    delta['runtime_sum'] += sign * _number(movie.get('Runtime'))
+    if with_title:
+        delta['added_titles' if sign > 0 else 'removed_titles'].append(movie.get('Title'))
+
+
+def _averages():
+    """Return the $set stage deriving the averages from the accumulated sums."""
+    return {
+        field: {
+            "$cond": {
+                "if": {"$gt": ["$film_count", 0]},
+                "then": {"$divide": [f"${source}", "$film_count"]},
+                "else": None
+            }
+        }
+        for field, source in (('average_rating', 'rating_sum'), ('average_runtime', 'runtime_sum'))
+    }
@@ -0,0 +1,114 @@
+import asyncio
+import inspect
+
+import pandas as pd
+from pymongo.errors import OperationFailure
+
+from app.persistence.connection import get_async_client
+from app.persistence.data_processor import (DESCRIBE_FIELDS, VIEW_NAMES, VIEW_PIPELINES, fetch_all_query,
+                                            quartile_sample_pipeline, sampled_quartiles, statistics_frame,
+                                            statistics_group, view_documents)
+from app.persistence.loader import DEFAULT_BATCH_SIZE, ColumnBuffers, projected_columns
+from app.utilities.analytics_engine import VIEW_COLUMNS
+from app.utilities.instrumentation import metrics
+
+
+async def _cursor(cursor):
+    """Return a cursor from pymongo's async API, which awaits aggregate(), or from motor's, which doesn't."""
+    return await cursor if inspect.isawaitable(cursor) else cursor
+
+
+class AsyncDataProcessor:
+    """Asyncio counterpart of the DataProcessor and DataVisualizer reads.
+
+    Every method is a coroutine running over the shared async client, so many
+    collection, view and statistics queries of one or several databases can be
+    awaited together (see gather_views) over one connection pool. Raw BSON
+    batches are decoded into column buffers as they arrive.
+    """
+
+    def __init__(self, db_name='cancer_db', uri=None):
+        # Take the shared asyncio client from the connection registry
+        self.client = get_async_client(uri)
+        self.db = self.client[db_name]
+
+    async def iter_data(self, collection_name, projection=None, filter=None, batch_size=DEFAULT_BATCH_SIZE,
+                        dtypes=None):
+        """Yield the data of a collection as one DataFrame per cursor batch, as batches arrive."""
+        columns = projected_columns(projection)
+        cursor = self.db[collection_name].find_raw_batches(filter or {}, projection, batch_size=batch_size)
+        async for raw_batch in cursor:
+            buffers = ColumnBuffers(columns)
+            buffers.extend(raw_batch)
+            yield buffers.to_frame(dtypes)
+
+    async def load_data(self, collection_name, projection=None, filter=None, batch_size=DEFAULT_BATCH_SIZE,
+                        dtypes=None):
+        """Load data from MongoDB into pandas DataFrame."""
+        with metrics.span('async_processor.load_data'):
+            buffers = ColumnBuffers(projected_columns(projection))
+            cursor = self.db[collection_name].find_raw_batches(filter or {}, projection, batch_size=batch_size)
+            async for raw_batch in cursor:
+                buffers.extend(raw_batch)
+            return buffers.to_frame(dtypes)
+
+    async def fetch_data(self, view_name, projection=None):
+        """Fetch data from the specified view, optionally limited to the projected fields."""
+        return await self.load_data(view_name, projection)
+
+    async def fetch_views(self, view_names=None):
+        """Fetch several views concurrently, keyed by view name."""
+        view_names = view_names or VIEW_NAMES
+        frames = await asyncio.gather(*(self.fetch_data(view) for view in view_names))
+        return dict(zip(view_names, frames))
+
+    async def fetch_all(self):
+        """Fetch the data of every view in a single aggregation, keyed by view name (see fetch_all_query)."""
+        with metrics.span('async_processor.fetch_all'):
+            source, pipeline = fetch_all_query(await self.db.list_collection_names())
+            cursor = await _cursor(self.db[source].aggregate(pipeline))
+            documents = view_documents(await cursor.to_list(length=None))
+            return {view: pd.DataFrame(documents.get(view, []), columns=VIEW_COLUMNS[view]) for view in VIEW_PIPELINES}
+
+    async def describe_data(self, collection_name, fields=None):
+        """Return descriptive statistics of the numeric fields, computed by the server like describe_data."""
+        fields = fields or DESCRIBE_FIELDS
+        collection = self.db[collection_name]
+        with metrics.span('async_processor.describe_data'):
+            try:
+                result = await self._first(collection, [{"$group": statistics_group(fields, percentiles=True)}])
+            except OperationFailure:
+                result = await self._first(collection, [{"$group": statistics_group(fields, percentiles=False)}])
+                if result is not None:
+                    cursor = await _cursor(collection.aggregate(quartile_sample_pipeline(fields)))
+                    result.update(sampled_quartiles(await cursor.to_list(length=None), fields))
+            return statistics_frame(result, fields)
+
+    @staticmethod
+    async def _first(collection, pipeline):
+        cursor = await _cursor(collection.aggregate(pipeline))
+        documents = await cursor.to_list(length=1)
+        return documents[0] if documents else None
+
+    async def get_top_rated_directors(self):
+        return await self.load_data('top_5_directors_rated')
+
+    async def get_longest_average_runtime_directors(self):
+        return await self.load_data('top_5_directors_longest_avg_runtime')
+
+    async def get_top_directors_by_film_count(self):
+        return await self.load_data('top_5_directors_most_films')
+
+    async def get_directors_with_most_movies(self):
+        return await self.load_data('top_5_directors_most_films')
+
+
+async def gather_views(db_names, view_names=None, uri=None):
+    """Fetch the views of several databases at once; returns {db_name: {view_name: DataFrame}}.
+
+    All queries share the async client's pool, so the whole call takes about as
+    long as the slowest query rather than the sum of them.
+    """
+    processors = [AsyncDataProcessor(db_name, uri) for db_name in db_names]
+    results = await asyncio.gather(*(processor.fetch_views(view_names) for processor in processors))
+    return dict(zip(db_names, results))
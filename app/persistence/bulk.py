@@ -0,0 +1,81 @@
+from pymongo import ASCENDING, UpdateOne
+from pymongo.errors import BulkWriteError
+
+DUPLICATE_KEY_ERROR = 11000
+
+
+def ensure_unique_index(collection, unique_key):
+    """Back the unique key with a unique index so upserts can match it cheaply."""
+    return collection.create_index([(unique_key, ASCENDING)], unique=True)
+
+
+def iter_batches(items, batch_size):
+    """Yield lists of at most batch_size items from any iterable."""
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def new_summary():
+    """Return an empty inserted/updated/skipped summary."""
+    return {'inserted': 0, 'updated': 0, 'skipped': 0}
+
+
+def merge_summary(total, summary):
+    """Add the counts of summary into total and return total."""
+    for key in ('inserted', 'updated', 'skipped'):
+        total[key] += summary.get(key, 0)
+    return total
+
+
+def upsert_batch(collection, batch, unique_key, ordered=False, update_existing=False):
+    """Write one batch through a single bulk_write of upserts keyed on unique_key.
+
+    With update_existing=False documents that already exist are left untouched
+    ($setOnInsert) and counted as skipped; otherwise they are overwritten ($set)
+    and counted as updated when something actually changed.
+    Returns the summary and the batch positions of the documents that were inserted.
+    """
+    summary = new_summary()
+    operator = '$set' if update_existing else '$setOnInsert'
+
+    requests, positions = [], []
+    for position, item in enumerate(batch):
+        unique_value = item.get(unique_key)
+        if unique_value is None:
+            summary['skipped'] += 1
+            continue
+        requests.append(UpdateOne({unique_key: unique_value}, {operator: item}, upsert=True))
+        positions.append(position)
+
+    inserted_positions = []
+    while requests:
+        try:
+            result = collection.bulk_write(requests, ordered=ordered).bulk_api_result
+            remaining = 0
+        except BulkWriteError as e:
+            # Duplicate keys raced in by a concurrent writer are already stored, so
+            # they count as skipped; anything else is a real failure.
+            result = e.details
+            errors = result.get('writeErrors', [])
+            if any(error.get('code') != DUPLICATE_KEY_ERROR for error in errors):
+                raise
+            summary['skipped'] += len(errors)
+            # An ordered bulk write stops at the first error; the rest is retried.
+            remaining = errors[-1]['index'] + 1 if ordered else len(requests)
+
+        inserted_positions.extend(positions[entry['index']] for entry in result.get('upserted', []))
+        summary['inserted'] += result.get('nUpserted', 0)
+        summary['updated'] += result.get('nModified', 0)
+        summary['skipped'] += result.get('nMatched', 0) - result.get('nModified', 0)
+
+        if not remaining:
+            break
+        requests, positions = requests[remaining:], positions[remaining:]
+
+    return summary, inserted_positions
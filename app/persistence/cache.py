@@ -0,0 +1,156 @@
+import hashlib
+import json
+import os
+import pickle
+import time
+from collections import OrderedDict
+
+VERSIONS_COLLECTION = 'collection_versions'
+
+
+def bump_collection_version(db, collection_name):
+    """Mark a collection as changed so cached results derived from it are invalidated."""
+    db[VERSIONS_COLLECTION].update_one({'_id': collection_name}, {'$inc': {'version': 1}}, upsert=True)
+
+
+def collection_version(db, collection_name):
+    """Return the current version counter of a collection (0 if it never changed)."""
+    document = db[VERSIONS_COLLECTION].find_one({'_id': collection_name})
+    return document['version'] if document else 0
+
+
+class MemoryBackend:
+    """Size-bounded LRU store kept in process memory."""
+
+    def __init__(self, max_entries=128):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+
+    def get(self, key):
+        entry = self.entries.get(key)
+        if entry is not None:
+            self.entries.move_to_end(key)
+        return entry
+
+    def set(self, key, entry):
+        self.entries[key] = entry
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def delete(self, key):
+        self.entries.pop(key, None)
+
+    def clear(self):
+        self.entries.clear()
+
+    def __len__(self):
+        return len(self.entries)
+
+
+class DiskBackend:
+    """Size-bounded LRU store of pickle files, so repeated report runs reuse results."""
+
+    def __init__(self, directory, max_entries=128):
+        self.directory = directory
+        self.max_entries = max_entries
+        os.makedirs(directory, exist_ok=True)
+
+    def get(self, key):
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as file:
+                entry = pickle.load(file)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            return None
+        os.utime(path)  # The modification time records the last access for LRU eviction
+        return entry
+
+    def set(self, key, entry):
+        path = self._path(key)
+        temporary_path = f"{path}.{os.getpid()}.tmp"
+        with open(temporary_path, 'wb') as file:
+            pickle.dump(entry, file, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temporary_path, path)
+        self._evict()
+
+    def delete(self, key):
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+
+    def clear(self):
+        for path in self._files():
+            os.remove(path)
+
+    def __len__(self):
+        return len(self._files())
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.pkl")
+
+    def _files(self):
+        return [os.path.join(self.directory, name) for name in os.listdir(self.directory) if name.endswith('.pkl')]
+
+    def _evict(self):
+        files = sorted(self._files(), key=os.path.getmtime)
+        for path in files[:max(len(files) - self.max_entries, 0)]:
+            os.remove(path)
+
+
+class ResultCache:
+    """TTL and LRU bounded cache of query results.
+
+    Entries are keyed by database, view or collection name, filter, projection and
+    dtypes, and are invalidated when the version counter bumped by ingestion no
+    longer matches the one they were stored with: the counter of the collection
+    itself, or of the source collection for results derived from it (views).
+    Callers get a copy of the cached value, so modifying it doesn't alter the cache.
+    """
+
+    def __init__(self, ttl=300, max_entries=128, backend=None, source='movies'):
+        self.ttl = ttl
+        self.backend = backend if backend is not None else MemoryBackend(max_entries)
+        self.source = source
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(db_name, name, filter=None, projection=None, dtypes=None):
+        """Return a stable key for a query."""
+        query = json.dumps([db_name, name, filter, projection, dtypes], sort_keys=True, default=str)
+        return hashlib.sha1(query.encode('utf-8')).hexdigest()
+
+    def get_or_load(self, db, name, loader, filter=None, projection=None, dtypes=None, derived=False):
+        """Return the cached result of a query, running loader() on a miss.
+
+        With derived=True the result is computed from the source collection (a view
+        or the $facet over it) and is invalidated by the source's version.
+        """
+        key = self.make_key(db.name, name, filter, projection, dtypes)
+        version = collection_version(db, self.source if derived else name)
+        entry = self.backend.get(key)
+        if entry is not None and entry['version'] == version and time.time() - entry['stored_at'] <= self.ttl:
+            self.hits += 1
+            return _copy(entry['value'])
+
+        self.misses += 1
+        value = loader()
+        self.backend.set(key, {'value': _copy(value), 'version': version, 'stored_at': time.time()})
+        return value
+
+    def clear(self):
+        """Drop every cached result."""
+        self.backend.clear()
+
+    def stats(self):
+        """Return the hit and miss counters and the number of stored entries."""
+        return {'hits': self.hits, 'misses': self.misses, 'entries': len(self.backend)}
+
+
+def _copy(value):
+    """Copy a cached DataFrame, or a dict of them, so callers and the cache don't share it."""
+    if isinstance(value, dict):
+        return {key: _copy(item) for key, item in value.items()}
+    return value.copy() if hasattr(value, 'copy') else value
@@ -0,0 +1,145 @@
+import numpy as np
+import pandas as pd
+
+from app.persistence.loader import DEFAULT_BATCH_SIZE, iter_frames
+from app.persistence.normalization import PEOPLE_COLUMNS, split_people_column
+
+# Long text fields left out of a compact load and fetched on demand
+LARGE_TEXT_FIELDS = ['Summary', 'Short Summary', 'Movie Poster', 'YouTube Trailer']
+
+# Scalar columns of a compact frame and the dtypes they are downcast to
+COMPACT_DTYPES = {'Year': 'int16', 'Runtime': 'float32', 'Rating': 'float32'}
+
+
+class PeopleCSR:
+    """Credit lists of every movie as CSR-style arrays.
+
+    The names of row i are categories[codes[offsets[i]:offsets[i + 1]]], so each
+    name is stored once and every credit costs a single int32.
+    """
+
+    def __init__(self, offsets, codes, categories):
+        self.offsets = offsets
+        self.codes = codes
+        self.categories = categories
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def row(self, i):
+        """Return the names credited on row i."""
+        return list(self.categories[self.codes[self.offsets[i]:self.offsets[i + 1]]])
+
+    def positions(self):
+        """Return the row position of every entry of codes."""
+        return np.repeat(np.arange(len(self), dtype=np.int64), np.diff(self.offsets))
+
+    def to_lists(self) -> pd.Series:
+        """Materialize the credit lists, e.g. for display."""
+        return pd.Series([self.row(i) for i in range(len(self))], dtype=object)
+
+    def nbytes(self):
+        return self.offsets.nbytes + self.codes.nbytes + int(self.categories.memory_usage(deep=True))
+
+
+class _PeopleBuilder:
+    """Build a PeopleCSR batch by batch with one vocabulary shared across batches."""
+
+    def __init__(self):
+        self.vocabulary = {}
+        self.counts = []
+        self.codes = []
+
+    def extend(self, values: pd.Series):
+        people = split_people_column(values).reset_index(drop=True)
+        self.counts.append(people.map(len).to_numpy(dtype=np.int64))
+        names = people.explode().dropna()
+        batch_codes, uniques = pd.factorize(names)
+        # Only the distinct names of the batch go through the Python-level vocabulary
+        mapping = np.array([self.vocabulary.setdefault(name, len(self.vocabulary)) for name in uniques],
+                           dtype=np.int32)
+        self.codes.append(mapping[batch_codes] if len(batch_codes) else np.empty(0, dtype=np.int32))
+
+    def build(self):
+        counts = np.concatenate(self.counts) if self.counts else np.empty(0, dtype=np.int64)
+        offsets = np.zeros(len(counts) + 1, dtype=np.int64)
+        np.cumsum(counts, out=offsets[1:])
+        codes = np.concatenate(self.codes) if self.codes else np.empty(0, dtype=np.int32)
+        categories = pd.Index(list(self.vocabulary), dtype=object)
+        return PeopleCSR(offsets, codes, categories)
+
+
+class CompactMovieFrame:
+    """Memory-lean movies for analytical workloads.
+
+    Scalar columns are downcast, IMDB IDs are stored as integers, credits are
+    interned into PeopleCSR codes and the large text fields are only fetched
+    (by IMDB ID) when text() asks for them.
+    """
+
+    def __init__(self, frame, people, collection=None):
+        self.frame = frame
+        self.people = people
+        self.collection = collection
+
+    @classmethod
+    def load(cls, collection, filter=None, batch_size=DEFAULT_BATCH_SIZE):
+        """Load a movies collection batch by batch without its large text fields."""
+        columns = ['Title', 'IMDB ID'] + list(COMPACT_DTYPES) + PEOPLE_COLUMNS
+        projection = {column: 1 for column in columns}
+        projection['_id'] = 0
+
+        scalars = []
+        builders = {column: _PeopleBuilder() for column in PEOPLE_COLUMNS}
+        for batch in iter_frames(collection, projection, filter, batch_size):
+            scalars.append(compact_scalars(batch))
+            for column, builder in builders.items():
+                builder.extend(batch[column])
+
+        frame = pd.concat(scalars, ignore_index=True) if scalars else compact_scalars(pd.DataFrame(columns=columns))
+        people = {column: builder.build() for column, builder in builders.items()}
+        return cls(frame, people, collection)
+
+    @classmethod
+    def from_frame(cls, data: pd.DataFrame):
+        """Build a compact frame from an already loaded or cleaned DataFrame."""
+        people = {}
+        for column in PEOPLE_COLUMNS:
+            builder = _PeopleBuilder()
+            if column in data.columns:
+                builder.extend(data[column])
+            people[column] = builder.build()
+        return cls(compact_scalars(data), people)
+
+    def __len__(self):
+        return len(self.frame)
+
+    def text(self, field, rows=None) -> pd.Series:
+        """Fetch a large text field for the given row positions (all rows by default)."""
+        if self.collection is None:
+            raise ValueError("This compact frame was not loaded from a collection.")
+        imdb_numbers = self.frame['imdb_number'] if rows is None else self.frame['imdb_number'].iloc[rows]
+        imdb_ids = [f"tt{number:07d}" for number in imdb_numbers]
+        texts = {}
+        for batch in iter_frames(self.collection, {'IMDB ID': 1, field: 1, '_id': 0}, {'IMDB ID': {'$in': imdb_ids}}):
+            texts.update(zip(batch['IMDB ID'], batch[field]))
+        return pd.Series([texts.get(imdb_id) for imdb_id in imdb_ids], index=imdb_numbers.index, name=field)
+
+    def memory_usage(self):
+        """Return the resident size in bytes of the frame and the credit arrays."""
+        return int(self.frame.memory_usage(deep=True).sum()) + sum(csr.nbytes() for csr in self.people.values())
+
+
+def compact_scalars(data: pd.DataFrame) -> pd.DataFrame:
+    """Return the Title, integer IMDB number and downcast numeric columns of a movies frame."""
+    imdb_numbers = pd.to_numeric(data['IMDB ID'].astype(str).str[2:], errors='coerce')
+    frame = pd.DataFrame({
+        'Title': data['Title'].to_numpy(dtype=object),
+        'imdb_number': imdb_numbers.fillna(-1).astype(np.int32).to_numpy(),
+    })
+    for column, dtype in COMPACT_DTYPES.items():
+        values = pd.to_numeric(data[column], errors='coerce')
+        if np.issubdtype(np.dtype(dtype), np.integer):
+            values = values.fillna(0)
+        frame[column] = values.astype(dtype).to_numpy()
+    return frame
@@ -0,0 +1,153 @@
+import os
+
+from pymongo import MongoClient
+
+from app.utilities.instrumentation import command_listener, metrics
+
+DEFAULT_URI = os.environ.get('MONGODB_URI', 'mongodb://localhost:27017/')
+
+# Process-wide client options, change them with configure() before the first get_client()
+_settings = {
+    'uri': DEFAULT_URI,
+    'maxPoolSize': 100,
+    'minPoolSize': 0,
+    'serverSelectionTimeoutMS': 30000,
+    'connectTimeoutMS': 20000,
+    'socketTimeoutMS': None,
+    'readPreference': 'primary',
+}
+_write_concern = {}
+_clients = {}
+_async_clients = {}
+
+
+def configure(uri=None, max_pool_size=None, min_pool_size=None, server_selection_timeout_ms=None,
+              connect_timeout_ms=None, socket_timeout_ms=None, read_preference=None, write_concern=None):
+    """Set the options every shared client is created with.
+
+    write_concern is a dict of pymongo write concern options (e.g. {'w': 'majority',
+    'wtimeoutMS': 5000}). Must be called before the first get_client(): objects
+    such as Database and mongoengine keep the client they were given, so clients
+    in use are never closed or replaced here.
+    """
+    _check_no_clients('configure()')
+    options = {
+        'uri': uri,
+        'maxPoolSize': max_pool_size,
+        'minPoolSize': min_pool_size,
+        'serverSelectionTimeoutMS': server_selection_timeout_ms,
+        'connectTimeoutMS': connect_timeout_ms,
+        'socketTimeoutMS': socket_timeout_ms,
+        'readPreference': read_preference,
+    }
+    _settings.update({key: value for key, value in options.items() if value is not None})
+    if write_concern is not None:
+        _write_concern.clear()
+        _write_concern.update(write_concern)
+
+
+def _check_no_clients(caller):
+    if _clients or _async_clients:
+        raise RuntimeError(f"{caller} must be called before the first client is created; "
+                           "call close_clients() first if no object still uses them")
+
+
+def settings():
+    """Return a copy of the current client options."""
+    return {**_settings, 'write_concern': dict(_write_concern)}
+
+
+def apply_settings(options):
+    """Restore client options returned by settings(), e.g. inside a worker process.
+
+    Like configure(), it must run before the process creates its first client.
+    """
+    _check_no_clients('apply_settings()')
+    options = dict(options)
+    write_concern = options.pop('write_concern', {})
+    _settings.update(options)
+    _write_concern.clear()
+    _write_concern.update(write_concern)
+
+
+def get_client(uri=None):
+    """Return the shared MongoClient for uri (the configured URI by default), creating it once."""
+    uri = uri or _settings['uri']
+    client = _clients.get(uri)
+    if client is None:
+        options = {key: value for key, value in _settings.items() if key != 'uri' and value is not None}
+        if metrics.enabled:
+            options['event_listeners'] = [command_listener()]  # Counts MongoDB round trips
+        client = MongoClient(uri, **options, **_write_concern)
+        _clients[uri] = client
+    return client
+
+
+def _async_client_class():
+    """Return pymongo's native asyncio client, or motor's on pymongo versions without it."""
+    try:
+        from pymongo import AsyncMongoClient
+        return AsyncMongoClient
+    except ImportError:
+        pass
+    try:
+        from motor.motor_asyncio import AsyncIOMotorClient
+    except ImportError as e:
+        raise ImportError("Async queries require pymongo>=4.10 or motor: pip install -U pymongo") from e
+    return AsyncIOMotorClient
+
+
+def get_async_client(uri=None):
+    """Return the shared asyncio client for uri, created once with the same options as get_client().
+
+    Its connection pool serves every coroutine of the event loop it is first used in.
+    """
+    uri = uri or _settings['uri']
+    client = _async_clients.get(uri)
+    if client is None:
+        options = {key: value for key, value in _settings.items() if key != 'uri' and value is not None}
+        if metrics.enabled:
+            options['event_listeners'] = [command_listener()]  # Counts MongoDB round trips
+        client = _async_client_class()(uri, **options, **_write_concern)
+        _async_clients[uri] = client
+    return client
+
+
+def register_client(client, uri=None):
+    """Use an existing client (e.g. an in-process stand-in) for uri."""
+    _clients[uri or _settings['uri']] = client
+    return client
+
+
+def close_clients():
+    """Close and forget every shared client."""
+    while _clients:
+        _, client = _clients.popitem()
+        client.close()
+    # Async clients are closed from their event loop (close_async_clients); here they are only forgotten
+    _async_clients.clear()
+
+
+async def close_async_clients():
+    """Close and forget every shared asyncio client."""
+    while _async_clients:
+        _, client = _async_clients.popitem()
+        closing = client.close()
+        if closing is not None:  # A coroutine with pymongo's client, a plain call with motor's
+            await closing
+
+
+def connect_mongoengine(db_name, uri=None, alias='default'):
+    """Bind mongoengine documents to the shared client instead of opening a separate pool."""
+    from mongoengine import connection
+
+    # mongoengine has no public way to adopt an existing client: connect() and
+    # register_connection() only take connection settings and always build their
+    # own MongoClient. The alias is registered for its settings, then its entries
+    # in the private client and database registries are replaced. These registries
+    # are covered by tests/test_connection.py and mongoengine is pinned in
+    # requirements.txt to the releases they were checked against.
+    connection._connections.pop(alias, None)
+    connection._dbs.pop(alias, None)
+    connection.register_connection(alias, db=db_name)
+    connection._connections[alias] = get_client(uri)
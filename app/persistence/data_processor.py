@@ -1,150 +1,317 @@
-import pandas as pd
-from pymongo import MongoClient
+from pymongo.errors import OperationFailure
+
+from app.persistence.aggregates import ACTOR_STATS, DIRECTOR_STATS, MaterializedAggregates, accumulators_exist
+from app.persistence.cache import bump_collection_version
+from app.persistence.connection import get_client
+from app.utilities.instrumentation import timed
+
+# Aggregation pipelines of the on-demand views over the movies collection
+VIEW_PIPELINES = {
+    'top_5_directors_most_films': [
+        {
+            "$unwind": "$Director"  # Director is stored as an array of names
+        },
+        {
+            "$group": {
+                "_id": "$Director",  # Group by director's name
+                "film_count": {"$sum": 1}  # Count the number of films
+            }
+        },
+        {
+            "$sort": {"film_count": -1}  # Sort by film count in descending order
+        },
+        {
+            "$limit": 5  # Limit to top 5 directors
+        }
+    ],
+    'top_5_directors_rated': [
+        {
+            "$unwind": "$Director"  # Director is stored as an array of names
+        },
+        {
+            "$group": {
+                "_id": "$Director",  # Group by director's name
+                "average_rating": {"$avg": "$Rating"}  # Calculate average rating
+            }
+        },
+        {
+            "$sort": {"average_rating": -1}  # Sort by average rating in descending order
+        },
+        {
+            "$limit": 5  # Limit to top 5 rated directors
+        }
+    ],
+    'top_5_directors_longest_avg_runtime': [
+        {
+            "$unwind": "$Director"  # Director is stored as an array of names
+        },
+        {
+            "$group": {
+                "_id": "$Director",  # Group by director's name
+                "average_runtime": {"$avg": "$Runtime"}  # Calculate average runtime
+            }
+        },
+        {
+            "$sort": {"average_runtime": -1}  # Sort by average runtime in descending order
+        },
+        {
+            "$limit": 5  # Limit to top 5 directors with longest average runtime
+        }
+    ],
+    'top_15_actors_with_movies': [
+        {
+            "$project": {
+                "Title": 1,  # Keep the movie title
+                "Cast": 1  # Cast is stored pre-split as an array of names
+            }
+        },
+        {
+            "$unwind": "$Cast"  # Flatten the Cast array
+        },
+        {
+            "$group": {
+                "_id": "$Cast",  # Group by actor's name
+                "movies": {"$push": "$Title"},  # Collect movies for each actor
+                "film_count": {"$sum": 1}  # Count the number of films
+            }
+        },
+        {
+            "$sort": {"film_count": -1}  # Sort by film count in descending order
+        },
+        {
+            "$limit": 15  # Limit to top 15 actors
+        }
+    ],
+}
+
+VIEW_NAMES = list(VIEW_PIPELINES)
+
+# Numeric fields summarized by describe_data, and the rows of its result like pandas describe()
+DESCRIBE_FIELDS = ['Year', 'Runtime', 'Rating']
+DESCRIBE_STATS = ['count', 'mean', 'std', 'min', '25%', '50%', '75%', 'max']
+QUANTILES = [0.25, 0.5, 0.75]
+# Documents sampled for the quartiles when the server has no $percentile (before MongoDB 7.0)
+QUANTILE_SAMPLE_SIZE = 10000
+
+# Field naming the view of each document returned by the materialized fetch_all_query
+VIEW_FIELD = '_view'
+# (view, backing collection, sort field, limit, projection) of the materialized views
+MATERIALIZED_VIEWS = [
+    ('top_5_directors_most_films', DIRECTOR_STATS, 'film_count', 5, {"film_count": 1}),
+    ('top_5_directors_rated', DIRECTOR_STATS, 'average_rating', 5, {"average_rating": 1}),
+    ('top_5_directors_longest_avg_runtime', DIRECTOR_STATS, 'average_runtime', 5, {"average_runtime": 1}),
+    ('top_15_actors_with_movies', ACTOR_STATS, 'film_count', 15, {"movies": 1, "film_count": 1}),
+]
+
 
 class DataProcessor:
-    def __init__(self, db_name='cancer_db'):
-        # Connect to MongoDB on localhost
-        self.client = MongoClient('mongodb://localhost:27017/')
+    def __init__(self, db_name='cancer_db', uri=None, cache=None):
+        # Take the shared client from the connection registry
+        self.client = get_client(uri)
         # Access the specified database
         self.db = self.client[db_name]
+        # Optional ResultCache for loaded collections and views
+        self.cache = cache
 
-    def load_data(self, collection_name):
+    @timed('processor.load_data')
+    def load_data(self, collection_name, projection=None, filter=None, batch_size=1000,
+                  dtypes=None):
         """Load data from MongoDB into pandas DataFrame."""
-        collection = self.db[collection_name]
-        return pd.DataFrame(list(collection.find()))
+        from app.persistence.loader import load_frame  # pandas is only imported once data is loaded
+
+        def loader():
+            return load_frame(self.db[collection_name], projection, filter, batch_size, dtypes)
+
+        if self.cache is None:
+            return loader()
+        # batch_size only changes how the cursor is read, not the frame, so it isn't part of the key.
+        # Views and the accumulators behind them change with movies, not with their own version
+        derived = collection_name in VIEW_PIPELINES or collection_name in (DIRECTOR_STATS, ACTOR_STATS)
+        return self.cache.get_or_load(self.db, collection_name, loader, filter, projection, dtypes, derived)
 
-    def display_data(self, collection_name):
-        """Display data from the specified collection."""
-        df = self.load_data(collection_name)
+    @timed('processor.load_compact')
+    def load_compact(self, collection_name='movies', filter=None, batch_size=1000):
+        """Load movies as a CompactMovieFrame for analytical workloads."""
+        from app.persistence.compact import CompactMovieFrame
+
+        return CompactMovieFrame.load(self.db[collection_name], filter, batch_size)
+
+    def compute_views_offline(self, collection_name='movies'):
+        """Compute the four view results in-process from a compact load, grouping on integer codes."""
+        from app.utilities.analytics_engine import AnalyticsEngine
+
+        return AnalyticsEngine.from_compact(self.load_compact(collection_name)).results()
+
+    @timed('processor.display_data')
+    def display_data(self, collection_name, rows=5, projection=None):
+        """Display the first rows of the specified collection.
+
+        Only those rows are fetched, through a limited and optionally projected cursor.
+        """
+        import pandas as pd
+
+        df = pd.DataFrame(list(self.db[collection_name].find({}, projection).limit(rows)))
         print(f"\n{collection_name.capitalize()} DataFrame:")
-        print(df.head())  # Display the first few rows
+        print(df)  # Display the first few rows
+        return df
 
-    def describe_data(self, collection_name):
-        """Display descriptive statistics of the collection."""
-        df = self.load_data(collection_name)
+    @timed('processor.describe_data')
+    def describe_data(self, collection_name, fields=None):
+        """Display descriptive statistics of the numeric fields of the collection.
+
+        The statistics are computed by the server in one $group aggregation, with
+        approximate $percentile quartiles; servers without $percentile get quartiles
+        of a $sample instead. Returns a DataFrame shaped like pandas describe().
+        """
+        stats = self.field_statistics(collection_name, fields or DESCRIBE_FIELDS)
         print(f"\nDescriptive Statistics of {collection_name.capitalize()}:")
-        print(df.describe())
+        print(stats)
+        return stats
+
+    def field_statistics(self, collection_name, fields):
+        """Compute the describe() statistics of fields on the server, one column per numeric field."""
+        collection = self.db[collection_name]
+        try:
+            result = next(collection.aggregate([{"$group": statistics_group(fields, percentiles=True)}]), None)
+        except OperationFailure:
+            result = next(collection.aggregate([{"$group": statistics_group(fields, percentiles=False)}]), None)
+            if result is not None:
+                sample = list(collection.aggregate(quartile_sample_pipeline(fields)))
+                result.update(sampled_quartiles(sample, fields))
+        return statistics_frame(result, fields)
+
+    @timed('processor.create_views')
+    def create_views(self, materialized=False):
+        """Create the top-N views.
 
-    def create_views(self):
+        With materialized=True the views read per-director and per-actor accumulators
+        kept in backing collections (see MaterializedAggregates) through their indexes
+        instead of grouping the whole movies collection on every read.
+        """
         # Drop existing views if they exist
-        views_to_drop = [
-            'top_5_directors_most_films',
-            'top_5_directors_rated',
-            'top_5_directors_longest_avg_runtime',
-            'top_15_actors_with_movies'
-        ]
-
-        for view in views_to_drop:
+        for view in VIEW_NAMES:
             try:
                 self.db.command('drop', view)
                 print(f"Dropped view: {view}")
             except Exception as e:
                 print(f"Error dropping view {view}: {e}")
 
-        # Create new views with updated pipelines
-        self.db.command('create', 'top_5_directors_most_films',
-                        viewOn='movies',
-                        pipeline=[
-                            {
-                                "$group": {
-                                    "_id": "$Director",  # Group by director's name
-                                    "film_count": {"$sum": 1}  # Count the number of films
-                                }
-                            },
-                            {
-                                "$sort": {"film_count": -1}  # Sort by film count in descending order
-                            },
-                            {
-                                "$limit": 5  # Limit to top 5 directors
-                            }
-                        ]
-                        )
-
-        self.db.command('create', 'top_5_directors_rated',
-                        viewOn='movies',
-                        pipeline=[
-                            {
-                                "$group": {
-                                    "_id": "$Director",  # Group by director's name
-                                    "average_rating": {"$avg": "$Rating"}  # Calculate average rating
-                                }
-                            },
-                            {
-                                "$sort": {"average_rating": -1}  # Sort by average rating in descending order
-                            },
-                            {
-                                "$limit": 5  # Limit to top 5 rated directors
-                            }
-                        ]
-                        )
-
-        self.db.command('create', 'top_5_directors_longest_avg_runtime',
-                        viewOn='movies',
-                        pipeline=[
-                            {
-                                "$group": {
-                                    "_id": "$Director",  # Group by director's name
-                                    "average_runtime": {"$avg": "$Runtime"}  # Calculate average runtime
-                                }
-                            },
-                            {
-                                "$sort": {"average_runtime": -1}  # Sort by average runtime in descending order
-                            },
-                            {
-                                "$limit": 5  # Limit to top 5 directors with longest average runtime
-                            }
-                        ]
-                        )
-
-        self.db.command('create', 'top_15_actors_with_movies',
-                        viewOn='movies',
-                        pipeline=[
-                            {
-                                "$project": {
-                                    "Title": 1,  # Keep the movie title
-                                    "Cast": {
-                                        "$cond": {
-                                            "if": {"$eq": [{"$type": "$Cast"}, "string"]},  # Check if Cast is a string
-                                            "then": {"$split": ["$Cast", "|"]},  # Split if it's a string
-                                            "else": []  # Return an empty array if it's not a string
-                                        }
-                                    }
-                                }
-                            },
-                            {
-                                "$unwind": "$Cast"  # Flatten the Cast array
-                            },
-                            {
-                                "$group": {
-                                    "_id": "$Cast",  # Group by actor's name
-                                    "movies": {"$push": "$Title"},  # Collect movies for each actor
-                                    "film_count": {"$sum": 1}  # Count the number of films
-                                }
-                            },
-                            {
-                                "$sort": {"film_count": -1}  # Sort by film count in descending order
-                            },
-                            {
-                                "$limit": 15  # Limit to top 15 actors
-                            }
-                        ]
-                        )
+        if materialized:
+            MaterializedAggregates(self.db).rebuild()
+        for view in VIEW_NAMES:
+            source, pipeline = view_definition(view, materialized)
+            self.db.command('create', view, viewOn=source, pipeline=pipeline)
 
+        # Cached view results were computed with the previous definitions
+        bump_collection_version(self.db, 'movies')
         print("Views created successfully.")
 
     def get_top_rated_directors(self):
-        return pd.DataFrame(list(self.db.top_rated_directors.find()))
+        return self.load_data('top_5_directors_rated')
 
     def get_longest_average_runtime_directors(self):
-        return pd.DataFrame(list(self.db.longest_average_runtime_directors.find()))
+        return self.load_data('top_5_directors_longest_avg_runtime')
 
     def get_top_directors_by_film_count(self):
-        return pd.DataFrame(list(self.db.top_directors_by_film_count.find()))
+        return self.load_data('top_5_directors_most_films')
 
     def get_directors_with_most_movies(self):
-        return pd.DataFrame(list(self.db.directors_with_most_movies.find()))
+        return self.load_data('top_5_directors_most_films')
+
+
+def materialized_pipeline(field, limit, projection):
+    """Return the pipeline of a materialized view: a sorted, limited read of an accumulator collection."""
+    return [
+        {"$sort": {field: -1}},  # Served by the descending index on field
+        {"$limit": limit},
+        {"$project": projection}
+    ]
+
+
+def view_definition(view, materialized):
+    """Return (source collection, pipeline) of a view.
+
+    Materialized views are sorted, limited reads of the accumulator collections;
+    the others aggregate the whole movies collection.
+    """
+    if materialized:
+        for name, source, field, limit, projection in MATERIALIZED_VIEWS:
+            if name == view:
+                return source, materialized_pipeline(field, limit, projection)
+    return 'movies', VIEW_PIPELINES[view]
+
+
+def fetch_all_query(collection_names):
+    """Return (collection, pipeline) of the one aggregation that returns the documents of every view.
+
+    When the accumulator collections are among collection_names, each view is a
+    sorted, limited read of its accumulator, tagged with its name in VIEW_FIELD;
+    the first view is the pipeline itself and the others are chained with
+    $unionWith, whose sub-pipelines (unlike those of $facet) are served by the
+    descending indexes. Otherwise the view pipelines run as a $facet over the
+    whole movies collection. See view_documents for reading the results.
+    """
+    if not accumulators_exist(collection_names):
+        return 'movies', [{"$facet": VIEW_PIPELINES}]
+    reads = [(source, materialized_pipeline(field, limit, projection) + [{"$set": {VIEW_FIELD: view}}])
+             for view, source, field, limit, projection in MATERIALIZED_VIEWS]
+    (source, pipeline), others = reads[0], reads[1:]
+    return source, pipeline + [{"$unionWith": {"coll": coll, "pipeline": stages}} for coll, stages in others]
+
+
+def view_documents(documents):
+    """Group the documents of a fetch_all_query aggregation by view name."""
+    views = {}
+    for document in documents:
+        view = document.pop(VIEW_FIELD, None)
+        if view is None:  # The single $facet document over movies
+            for name, items in document.items():
+                views.setdefault(name, []).extend(items)
+        else:
+            views.setdefault(view, []).append(document)
+    return views
+
+
+def statistics_group(fields, percentiles):
+    """Return the $group stage computing count, mean, std, min, max (and quartiles) of numeric fields."""
+    group = {"_id": None}
+    for field in fields:
+        is_number = {"$isNumber": f"${field}"}
+        value = {"$cond": [is_number, f"${field}", None]}  # Strings and missing values are ignored
+        group[f"{field}_count"] = {"$sum": {"$cond": [is_number, 1, 0]}}
+        group[f"{field}_mean"] = {"$avg": value}
+        group[f"{field}_std"] = {"$stdDevSamp": value}  # Sample std, as pandas computes it
+        group[f"{field}_min"] = {"$min": value}
+        group[f"{field}_max"] = {"$max": value}
+        if percentiles:
+            group[f"{field}_quartiles"] = {"$percentile": {"input": value, "p": QUANTILES, "method": "approximate"}}
+    return group
+
+
+def quartile_sample_pipeline(fields):
+    """Return the pipeline sampling the documents quartiles are estimated from without $percentile."""
+    return [{"$sample": {"size": QUANTILE_SAMPLE_SIZE}},
+            {"$project": {"_id": 0, **{field: 1 for field in fields}}}]
+
 
+def sampled_quartiles(documents, fields):
+    """Estimate the quartiles of each field from sampled documents, keyed like the $group result."""
+    import pandas as pd
 
+    sample = pd.DataFrame(documents, columns=fields)
+    return {f"{field}_quartiles": pd.to_numeric(sample[field], errors='coerce').quantile(QUANTILES).tolist()
+            for field in fields}
 
 
+def statistics_frame(result, fields):
+    """Shape the statistics $group result like pandas describe(), one column per numeric field."""
+    import pandas as pd
 
+    stats = {}
+    for field in fields:
+        if result is None or not result[f"{field}_count"]:
+            continue  # Like describe(), leave out columns without numbers
+        quartiles = result[f"{field}_quartiles"]
+        stats[field] = [result[f"{field}_count"], result[f"{field}_mean"], result[f"{field}_std"],
+                        result[f"{field}_min"], *quartiles, result[f"{field}_max"]]
+    return pd.DataFrame(stats, index=DESCRIBE_STATS, columns=list(stats), dtype=float)
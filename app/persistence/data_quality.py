@@ -1,6 +1,8 @@
+import numpy as np
 import pandas as pd
 import logging
 from datetime import datetime
+from pandas.api.types import is_bool_dtype, is_numeric_dtype
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -10,75 +12,127 @@ class DataQualityChecker:
     def __init__(self, data: pd.DataFrame):
         """Initialize with the DataFrame that will be checked for quality."""
         self.data = data
+        self.report = None
         logging.info("DataQualityChecker initialized with data.")
 
+    def missing_values_mask(self) -> pd.Series:
+        """Return a mask of rows without any missing value."""
+        return self.data.notna().all(axis=1)
+
+    def valid_year_mask(self) -> pd.Series:
+        """Return a mask of rows whose 'Year' lies within a reasonable range."""
+        valid_year_range = (1888, datetime.now().year)  # Movies start from 1888
+        return self.data['Year'].between(valid_year_range[0], valid_year_range[1])
+
+    def imdb_id_format_mask(self) -> pd.Series:
+        """Return a mask of rows whose 'IMDB ID' follows the typical format (e.g., tt1234567)."""
+        return self.data['IMDB ID'].str.match(r'^tt\d{7}$', na=False)
+
+    def runtime_format_mask(self) -> pd.Series:
+        """Return a mask of rows whose 'Runtime' is a valid positive number."""
+        runtime = self.data['Runtime']
+        if is_numeric_dtype(runtime) and not is_bool_dtype(runtime):
+            return runtime.gt(0)
+        # Mixed object columns only accept actual numbers, not numeric strings
+        is_number = runtime.map(type).isin(NUMERIC_TYPES)
+        return is_number & pd.to_numeric(runtime.where(is_number), errors='coerce').gt(0)
+
+    def rating_format_mask(self) -> pd.Series:
+        """Return a mask of rows whose 'Rating' is a valid float between 0 and 10."""
+        return self.data['Rating'].between(0, 10)
+
+    def build_masks(self) -> dict:
+        """Return the keep-mask of every applicable rule, keyed by rule name."""
+        masks = {'missing_values': self.missing_values_mask()}
+        for rule, (column, mask_builder) in COLUMN_RULES.items():
+            if column in self.data.columns:
+                masks[rule] = mask_builder(self)
+        return masks
+
     def check_missing_values(self) -> pd.DataFrame:
         """Return DataFrame with missing values removed."""
-        missing_count = self.data.isnull().sum().sum()
-        if missing_count > 0:
-            logging.warning(f"Missing values found: {missing_count}. Removing rows with missing values.")
-        return self.data.dropna()
+        return self._apply_rule('missing_values', self.missing_values_mask())
 
     def check_valid_year(self) -> pd.DataFrame:
         """Check if 'Year' is a valid integer within a reasonable range."""
-        if 'Year' in self.data.columns:
-            valid_year_range = (1888, datetime.now().year)  # Movies start from 1888
-            invalid_count = self.data[~self.data['Year'].between(valid_year_range[0], valid_year_range[1])].shape[0]
-            if invalid_count > 0:
-                logging.warning(f"Invalid years found: {invalid_count}. Removing these rows.")
-                return self.data[self.data['Year'].between(valid_year_range[0], valid_year_range[1])]
-        return self.data  # If 'Year' doesn't exist, return as is
+        return self._check_column_rule('valid_year')
 
     def check_imdb_id_format(self) -> pd.DataFrame:
         """Check if 'IMDB ID' follows the typical format (e.g., tt1234567)."""
-        if 'IMDB ID' in self.data.columns:
-            valid_imdb_format = self.data['IMDB ID'].str.match(r'^tt\d{7}$', na=False)
-            invalid_count = self.data[~valid_imdb_format].shape[0]
-            if invalid_count > 0:
-                logging.warning(f"Invalid IMDB IDs found: {invalid_count}. Removing these rows.")
-                return self.data[valid_imdb_format]
-        return self.data  # If 'IMDB ID' doesn't exist, return as is
+        return self._check_column_rule('imdb_id_format')
 
     def check_runtime_format(self) -> pd.DataFrame:
         """Check if 'Runtime' is a valid positive integer."""
-        if 'Runtime' in self.data.columns:
-            invalid_count = self.data[~self.data['Runtime'].apply(lambda x: isinstance(x, (int, float)) and x > 0)].shape[0]
-            if invalid_count > 0:
-                logging.warning(f"Invalid Runtime values found: {invalid_count}. Removing these rows.")
-                return self.data[self.data['Runtime'].apply(lambda x: isinstance(x, (int, float)) and x > 0)]
-        return self.data  # If 'Runtime' doesn't exist, return as is
+        return self._check_column_rule('runtime_format')
 
     def check_rating_format(self) -> pd.DataFrame:
         """Check if 'Rating' is a valid float between 0 and 10."""
-        if 'Rating' in self.data.columns:
-            invalid_count = self.data[~self.data['Rating'].between(0, 10)].shape[0]
-            if invalid_count > 0:
-                logging.warning(f"Invalid Ratings found: {invalid_count}. Removing these rows.")
-                return self.data[self.data['Rating'].between(0, 10)]
-        return self.data  # If 'Rating' doesn't exist, return as is
+        return self._check_column_rule('rating_format')
 
     def clean_data(self) -> pd.DataFrame:
         """Clean the DataFrame based on defined quality checks and return only valid data."""
-        # Start with the original data
-        cleaned_data = self.data
-
-        # Remove missing values
-        cleaned_data = self.check_missing_values()
-
-        # Check valid year
-        cleaned_data = self.check_valid_year()
-
-        # Check IMDB ID format
-        cleaned_data = self.check_imdb_id_format()
-
-        # Check runtime format
-        cleaned_data = self.check_runtime_format()
-
-        # Check rating format
-        cleaned_data = self.check_rating_format()
+        cleaned_data, _ = self.clean_data_with_report()
+        return cleaned_data
 
+    def clean_data_with_report(self):
+        """Apply every quality check in a single pass and report what was rejected.
+
+        All rule masks are combined into one keep-mask and the data is filtered once.
+        The report holds the number of rows failing each rule (a row failing several
+        rules counts towards each of them) and the index of every rejected row.
+        """
+        masks = self.build_masks()
+        keep = pd.Series(True, index=self.data.index)
+        rejected_counts = {}
+        for rule, mask in masks.items():
+            rejected_counts[rule] = int((~mask).sum())
+            if rejected_counts[rule] > 0:
+                logging.warning(f"{RULE_LABELS[rule]} found: {rejected_counts[rule]}. Removing these rows.")
+            keep &= mask
+
+        cleaned_data = self.data[keep]
+        self.report = {
+            'total_rows': len(self.data),
+            'kept_rows': len(cleaned_data),
+            'rejected_counts': rejected_counts,
+            'rejected_index': self.data.index[~keep.to_numpy()],
+        }
         logging.info("Data cleaning completed.")
-        return cleaned_data
+        return cleaned_data, self.report
+
+    def _check_column_rule(self, rule) -> pd.DataFrame:
+        """Apply a single column rule, returning the data as is if the column doesn't exist."""
+        column, mask_builder = COLUMN_RULES[rule]
+        if column not in self.data.columns:
+            return self.data
+        return self._apply_rule(rule, mask_builder(self))
+
+    def _apply_rule(self, rule, mask) -> pd.DataFrame:
+        """Filter the data with a single rule mask, logging how many rows it removes."""
+        invalid_count = int((~mask).sum())
+        if invalid_count > 0:
+            logging.warning(f"{RULE_LABELS[rule]} found: {invalid_count}. Removing these rows.")
+        return self.data[mask]
+
+
+# Scalar types accepted as a Runtime when the column holds mixed Python objects
+NUMERIC_TYPES = [int, float, np.int32, np.int64, np.float32, np.float64]
+
+# Rules that only apply when their column exists, in the order they are checked
+COLUMN_RULES = {
+    'valid_year': ('Year', DataQualityChecker.valid_year_mask),
+    'imdb_id_format': ('IMDB ID', DataQualityChecker.imdb_id_format_mask),
+    'runtime_format': ('Runtime', DataQualityChecker.runtime_format_mask),
+    'rating_format': ('Rating', DataQualityChecker.rating_format_mask),
+}
+
+RULE_LABELS = {
+    'missing_values': 'Rows with missing values',
+    'valid_year': 'Invalid years',
+    'imdb_id_format': 'Invalid IMDB IDs',
+    'runtime_format': 'Invalid Runtime values',
+    'rating_format': 'Invalid Ratings',
+}
 
 
 # Example usage
@@ -101,7 +155,8 @@ if __name__ == "__main__":
 
     # Initialize and clean data
     checker = DataQualityChecker(data)
-    cleaned_data = checker.clean_data()
+    cleaned_data, report = checker.clean_data_with_report()
 
-    # Display cleaned data
+    # Display cleaned data and what was rejected
     print(cleaned_data)
+    print(report)
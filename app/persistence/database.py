@@ -1,14 +1,76 @@
-from pymongo import MongoClient
 import pandas as pd
 import json
+import os
+from pymongo import ASCENDING
 
+from app.persistence.aggregates import MaterializedAggregates, accumulators_exist
+from app.persistence.bulk import ensure_unique_index, iter_batches, merge_summary, new_summary, upsert_batch
+from app.persistence.cache import bump_collection_version
+from app.persistence.compact import CompactMovieFrame
+from app.persistence.connection import get_client
 from app.persistence.data_quality import DataQualityChecker
+from app.persistence.delta import (changed_rows_mask, default_manifest_path, file_checksum, file_stat,
+                                   file_unchanged, load_manifest, row_hashes, save_manifest)
+from app.persistence.loader import DEFAULT_BATCH_SIZE, iter_frames, load_frame
+from app.persistence.normalization import PEOPLE_COLUMNS, PEOPLE_DELIMITER, distinct_people, normalize_people
+from app.persistence.search import MovieSearch
+from app.utilities.instrumentation import metrics, timed
+
+# Indexes on movies besides the unique 'IMDB ID'; multikey for the credit arrays
+MOVIE_INDEXED_FIELDS = ['Cast', 'Director', 'Writers', 'Year', 'Rating']
 
 
 class Database:
-    def __init__(self, db_name, uri='mongodb://localhost:27017/'):
-        self.client = MongoClient(uri)
+    def __init__(self, db_name, uri=None):
+        self.uri = uri
+        self.client = get_client(uri)
         self.db = self.client[db_name]
+        self.change_listeners = []
+
+    def add_change_listener(self, listener):
+        """Register an object whose on_change(collection_name, added, removed) sees every write."""
+        self.change_listeners.append(listener)
+        return listener
+
+    def enable_materialized_aggregates(self, source='movies'):
+        """Keep the director and actor accumulators up to date while ingesting into source."""
+        return self.add_change_listener(MaterializedAggregates(self.db, source))
+
+    def _watch_materialized_aggregates(self, collection_name):
+        """Keep existing accumulators of collection_name up to date even if nobody enabled them.
+
+        Once views --materialized has created them, every write to movies must be
+        folded in, or the materialized views would keep serving stale results.
+        """
+        if collection_name != 'movies' or any(isinstance(listener, MaterializedAggregates)
+                                              and listener.source == collection_name
+                                              for listener in self.change_listeners):
+            return
+        if accumulators_exist(self.db.list_collection_names()):
+            self.enable_materialized_aggregates(collection_name)
+
+    def enable_related_movies(self, source='movies', k=10):
+        """Keep the related-movies index of source up to date; its rows are refreshed when a setup finishes."""
+        from app.persistence.related import RelatedMoviesIndex
+
+        return self.add_change_listener(RelatedMoviesIndex(self.db, source, k))
+
+    def flush_change_listeners(self):
+        """Let listeners that defer their work (see RelatedMoviesIndex.flush) apply it."""
+        for listener in self.change_listeners:
+            flush = getattr(listener, 'flush', None)
+            if flush is not None:
+                flush()
+
+    def rebuild_change_listeners(self, collection_name):
+        """Recompute the listeners of collection_name from the whole collection, after writes they didn't see."""
+        for listener in self.change_listeners:
+            if getattr(listener, 'source', None) != collection_name:
+                continue
+            # MaterializedAggregates.rebuild, RelatedMoviesIndex.build
+            rebuild = getattr(listener, 'rebuild', None) or getattr(listener, 'build', None)
+            if rebuild is not None:
+                rebuild()
 
     def create_collection(self, collection_name):
         """Create collection dynamically."""
@@ -16,31 +78,125 @@ class Database:
             self.db.create_collection(collection_name)
             print(f"{collection_name.capitalize()} collection created.")
 
+    @timed('database.clean_data')
     def clean_data(self, data: pd.DataFrame) -> pd.DataFrame:
         """Clean the DataFrame based on quality checks."""
         checker = DataQualityChecker(data)
         cleaned_data = checker.clean_data()
+        metrics.incr('rows_rejected', len(data) - len(cleaned_data))
         return cleaned_data
 
-    def insert_data(self, data, collection_name, unique_key):
-        """Insert data into the specified collection while avoiding duplicates."""
+    @timed('database.insert_data')
+    def insert_data(self, data, collection_name, unique_key, batch_size=1000, ordered=False,
+                    update_existing=False):
+        """Insert data into the specified collection while avoiding duplicates.
+
+        Documents are written in batches of batch_size through bulk upserts on
+        unique_key, which is backed by a unique index. Returns a summary with the
+        inserted, updated and skipped counts.
+        """
         collection = self.db[collection_name]
+        ensure_unique_index(collection, unique_key)
+        self._watch_materialized_aggregates(collection_name)
 
-        for item in data:
-            # Use the correct unique key based on the collection
-            if collection_name == 'movies':
-                unique_value = item.get('imdb')
-            elif collection_name == 'directors':
-                unique_value = item.get('name')
-            else:
-                print(f"Unknown collection: {collection_name}")
-                continue
+        summary = new_summary()
+        for batch in iter_batches(data, batch_size):
+            previous = self._previous_versions(collection, batch, unique_key, update_existing)
+            batch_summary, inserted_positions = upsert_batch(collection, batch, unique_key, ordered,
+                                                             update_existing)
+            merge_summary(summary, batch_summary)
+            if self.change_listeners:
+                added = [batch[position] for position in inserted_positions]
+                added.extend(item for item in batch if item.get(unique_key) in previous)
+                self._notify_change(collection_name, added, list(previous.values()))
+
+        for outcome in ('inserted', 'updated', 'skipped'):
+            metrics.incr(f"rows_{outcome}", summary[outcome], collection=collection_name)
+        if summary['inserted'] or summary['updated']:
+            bump_collection_version(self.db, collection_name)  # Invalidates cached results
+
+        print(f"{collection_name.capitalize()}: {summary['inserted']} inserted, "
+              f"{summary['updated']} updated, {summary['skipped']} skipped.")
+        return summary
+
+    def _previous_versions(self, collection, batch, unique_key, update_existing):
+        """Fetch the stored documents a batch is about to overwrite, keyed by unique value.
 
-            if not self.item_exists(collection, item, unique_key):
-                collection.insert_one(item)
-                print(f"Inserted into {collection_name}: {unique_value}")
-            else:
-                print(f"Item already exists in {collection_name}: {unique_value}")
+        Only needed when listeners must see what an update replaced; with
+        update_existing=False existing documents are never touched.
+        """
+        if not (self.change_listeners and update_existing):
+            return {}
+        keys = [item.get(unique_key) for item in batch if item.get(unique_key) is not None]
+        return {document[unique_key]: document
+                for document in collection.find({unique_key: {'$in': keys}}, {'_id': 0})}
+
+    @timed('database.delete_data')
+    def delete_data(self, collection_name, unique_key, keys, batch_size=1000):
+        """Delete the documents whose unique_key is in keys, batch by batch.
+
+        Change listeners see the deleted documents as removed. Returns the number
+        of deleted documents.
+        """
+        collection = self.db[collection_name]
+        self._watch_materialized_aggregates(collection_name)
+        deleted = 0
+        for batch in iter_batches(list(keys), batch_size):
+            query = {unique_key: {'$in': batch}}
+            removed = list(collection.find(query, {'_id': 0})) if self.change_listeners else []
+            deleted += collection.delete_many(query).deleted_count
+            if removed:
+                self._notify_change(collection_name, [], removed)
+
+        metrics.incr('rows_deleted', deleted, collection=collection_name)
+        if deleted:
+            bump_collection_version(self.db, collection_name)  # Invalidates cached results
+        print(f"{collection_name.capitalize()}: {deleted} deleted.")
+        return deleted
+
+    def _notify_change(self, collection_name, added, removed):
+        """Tell every change listener which documents were added to and removed from a collection."""
+        for listener in self.change_listeners:
+            listener.on_change(collection_name, added, removed)
+
+    def ensure_movie_indexes(self, collection_name='movies'):
+        """Create the indexes actor, director, year, rating and search queries rely on.
+
+        Director, Writers and Cast hold arrays of names, so their indexes are multikey.
+        The text index of MovieSearch is created here too, once per ingestion.
+        """
+        collection = self.db[collection_name]
+        collection.create_index([('IMDB ID', ASCENDING)], unique=True)
+        for field in MOVIE_INDEXED_FIELDS:
+            collection.create_index([(field, ASCENDING)])
+        MovieSearch(collection).ensure_indexes()
+
+    def search(self, collection_name='movies'):
+        """Return a MovieSearch over a movies collection.
+
+        Its indexes are created by ensure_movie_indexes() when movies are ingested or restored.
+        """
+        return MovieSearch(self.db[collection_name])
+
+    def normalize_people_fields(self, collection_name='movies'):
+        """Convert credit fields still stored as delimited strings into arrays in place.
+
+        Names are trimmed and empty ones dropped, like split_people does at ingestion.
+        Returns the number of documents modified.
+        """
+        collection = self.db[collection_name]
+        modified = 0
+        for field in PEOPLE_COLUMNS:
+            names = {
+                "$map": {"input": {"$split": [f"${field}", PEOPLE_DELIMITER]}, "in": {"$trim": {"input": "$$this"}}}
+            }
+            result = collection.update_many({field: {'$type': 'string', '$not': {'$type': 'array'}}}, [
+                {'$set': {field: {"$filter": {"input": names, "cond": {"$ne": ["$$this", ""]}}}}}
+            ])
+            modified += result.modified_count
+        if modified:
+            bump_collection_version(self.db, collection_name)  # Invalidates cached results
+        return modified
 
     def item_exists(self, collection, item, unique_key):
         """Check if an item already exists in the collection."""
@@ -56,29 +212,195 @@ class Database:
         """Load data from a CSV file using pandas."""
         return pd.read_csv(csv_file).to_dict(orient='records')
 
-    def setup_database(self, data, collection_name, unique_key):
-        """Setup the database and insert data into the specified collection while avoiding duplicates."""
+    def iter_csv_chunks(self, csv_file, chunksize=10000):
+        """Yield the CSV file as DataFrames of at most chunksize rows."""
+        with pd.read_csv(csv_file, chunksize=chunksize) as reader:
+            chunks = iter(reader)
+            while True:
+                with metrics.span('database.read_csv'):
+                    chunk = next(chunks, None)
+                if chunk is None:
+                    return
+                metrics.incr('rows_read', len(chunk))
+                yield chunk
+
+    @timed('database.setup_database')
+    def setup_database(self, data, collection_name, unique_key, batch_size=1000, ordered=False):
+        """Setup the database and insert data into the specified collection while avoiding duplicates.
+
+        Returns a dict mapping each written collection to its insert summary.
+        """
         # Ensure data is a DataFrame
         if isinstance(data, list):
             data = pd.DataFrame(data)
+        metrics.incr('rows_read', len(data))
+        if collection_name == 'movies':
+            self.ensure_movie_indexes(collection_name)
+
+        summaries = {}
+        self._ingest_chunk(data, collection_name, unique_key, summaries, set(), batch_size, ordered)
+        self.flush_change_listeners()
+        return summaries
+
+    @timed('database.setup_database_from_csv')
+    def setup_database_from_csv(self, csv_file, collection_name, unique_key, chunksize=10000,
+                                batch_size=1000, ordered=False):
+        """Stream a CSV file into the specified collection chunk by chunk.
+
+        Each chunk is cleaned and written before the next one is read, so peak
+        memory depends on chunksize rather than on the size of the file.
+        Returns a dict mapping each written collection to its insert summary.
+        """
+        if collection_name == 'movies':
+            self.ensure_movie_indexes(collection_name)
+
+        summaries = {}
+        seen_directors = set()
+        for chunk in self.iter_csv_chunks(csv_file, chunksize):
+            self._ingest_chunk(chunk, collection_name, unique_key, summaries, seen_directors,
+                               batch_size, ordered)
+        self.flush_change_listeners()
+        return summaries
+
+    @timed('database.setup_database_delta')
+    def setup_database_delta(self, path, collection_name, unique_key, manifest_path=None, delete_missing=False,
+                             chunksize=10000, batch_size=1000, ordered=False):
+        """Ingest only what changed in a CSV file, or a directory of CSV shards, since the last run.
+
+        A manifest keeps the size, modification time and sha256 of every file and a
+        content hash of every row keyed by unique_key. Unchanged files aren't read
+        at all; in changed files only new or modified rows are cleaned and upserted.
+        With delete_missing=True, documents whose row disappeared from the files are
+        deleted. Returns a report with the skipped files, row counts and summaries.
+        """
+        from app.persistence.parallel_ingest import csv_inputs
+
+        manifest_path = manifest_path or default_manifest_path(path)
+        manifest = load_manifest(manifest_path)
+        previous_files = manifest['files']
+        if collection_name == 'movies':
+            self.ensure_movie_indexes(collection_name)
+
+        files = {}
+        summaries = {}
+        seen_directors = set()
+        report = {'files_skipped': 0, 'rows_unchanged': 0, 'rows_changed': 0, 'deleted': 0}
+        for csv_file in csv_inputs(path):
+            source = os.path.abspath(csv_file)
+            entry = previous_files.get(source)
+            stat = file_stat(csv_file)
+            unchanged, checksum = file_unchanged(entry, stat, csv_file)
+            if unchanged:
+                files[source] = dict(entry, **stat)
+                report['files_skipped'] += 1
+                continue
+
+            previous_rows = entry['rows'] if entry else {}
+            rows = {}
+            for chunk in self.iter_csv_chunks(csv_file, chunksize):
+                hashes = row_hashes(chunk, unique_key)
+                changed = changed_rows_mask(chunk, hashes, previous_rows, unique_key)
+                rows.update(zip(hashes.index, hashes.tolist()))
+                report['rows_unchanged'] += int((~changed).sum())
+                report['rows_changed'] += int(changed.sum())
+                if changed.any():
+                    self._ingest_chunk(chunk[changed], collection_name, unique_key, summaries, seen_directors,
+                                       batch_size, ordered, update_existing=True)
+            files[source] = dict(stat, sha256=checksum or file_checksum(csv_file), rows=rows)
 
-        # Clean the data
-        cleaned_data = self.clean_data(data)
+        if delete_missing:
+            current = set().union(*(entry['rows'] for entry in files.values()))
+            missing = set().union(*(entry['rows'] for entry in previous_files.values())) - current
+            if missing:
+                report['deleted'] = self.delete_data(collection_name, unique_key, missing, batch_size)
+
+        self.flush_change_listeners()
+        # Only a completed run updates the manifest, so a failed one is retried in full
+        manifest['files'] = files
+        save_manifest(manifest_path, manifest)
+        report['summaries'] = summaries
+        print(f"Delta ingest: {report['files_skipped']} unchanged files skipped, {report['rows_changed']} rows "
+              f"changed, {report['rows_unchanged']} unchanged, {report['deleted']} deleted.")
+        return report
+
+    def setup_database_parallel(self, path, collection_name, unique_key, workers=None, chunksize=10000,
+                                batch_size=1000, ordered=False):
+        """Ingest a CSV file or a directory of CSV shards with a pool of worker processes.
+
+        See parallel_ingest.ingest_parallel; returns its report with per-worker throughput.
+        The worker processes write without the change listeners, so the listeners of
+        collection_name are rebuilt from the whole collection once they are done.
+        """
+        from app.persistence.parallel_ingest import ingest_parallel
+
+        report = ingest_parallel(path, self.db.name, collection_name, unique_key, workers=workers, uri=self.uri,
+                                 chunksize=chunksize, batch_size=batch_size, ordered=ordered)
+        self.rebuild_change_listeners(collection_name)
+        return report
+
+    def _ingest_chunk(self, data, collection_name, unique_key, summaries, seen_directors,
+                      batch_size, ordered, update_existing=False):
+        """Clean one DataFrame, write it and write any director not seen before."""
+        # Clean the data and store the credits as arrays of names
+        cleaned_data = normalize_people(self.clean_data(data))
 
         # Insert movie data
-        self.insert_data(cleaned_data.to_dict(orient='records'), collection_name, unique_key)
+        summary = self.insert_data(cleaned_data.to_dict(orient='records'), collection_name, unique_key,
+                                   batch_size=batch_size, ordered=ordered, update_existing=update_existing)
+        merge_summary(summaries.setdefault(collection_name, new_summary()), summary)
 
         # Insert directors into the 'directors' collection if applicable
         if collection_name == 'movies':
-            directors = set()
-            for item in cleaned_data.to_dict(orient='records'):
-                directors.add(item['Director'])  # Collect unique director names
+            # Collect unique director names that earlier chunks did not already write
+            directors = distinct_people(cleaned_data['Director']) - seen_directors
+            seen_directors.update(directors)
 
             # Prepare data for directors collection
-            director_data = [{'name': director} for director in directors if director is not None]
-            self.insert_data(director_data, collection_name='directors', unique_key='name')
+            director_data = [{'name': director} for director in directors]
+            summary = self.insert_data(director_data, collection_name='directors', unique_key='name',
+                                       batch_size=batch_size, ordered=ordered)
+            merge_summary(summaries.setdefault('directors', new_summary()), summary)
+
+    @timed('database.export_snapshot')
+    def export_snapshot(self, directory, format='bson', collections=None, batch_size=DEFAULT_BATCH_SIZE,
+                        compress=True, compression='zstd', compresslevel=None):
+        """Export movies, directors and the views to a BSON or Parquet snapshot directory.
+
+        See snapshot.export_snapshot; returns the snapshot manifest.
+        """
+        from app.persistence.snapshot import GZIP_LEVEL, export_snapshot
 
-    def load_data(self, collection_name):
+        return export_snapshot(self.db, directory, format, collections, batch_size, compress, compression,
+                               GZIP_LEVEL if compresslevel is None else compresslevel)
+
+    @timed('database.restore_snapshot')
+    def restore_snapshot(self, directory, collections=None, workers=4, batch_size=DEFAULT_BATCH_SIZE, drop=True):
+        """Bulk-load a snapshot directory with a pool of threads and rebuild the movie indexes.
+
+        Returns a dict mapping each restored collection to its document count.
+        """
+        from app.persistence.snapshot import restore_snapshot
+
+        restored = restore_snapshot(self.db, directory, collections, workers, batch_size, drop)
+        if 'movies' in restored:
+            self.ensure_movie_indexes('movies')
+            self.rebuild_change_listeners('movies')  # The restored documents bypassed the listeners
+        for collection_name in restored:
+            bump_collection_version(self.db, collection_name)  # Invalidates cached results
+        return restored
+
+    @timed('database.load_compact')
+    def load_compact(self, collection_name='movies', filter=None, batch_size=DEFAULT_BATCH_SIZE):
+        """Load movies as a CompactMovieFrame: downcast scalars, interned credits, no large texts."""
+        return CompactMovieFrame.load(self.db[collection_name], filter, batch_size)
+
+    @timed('database.load_data')
+    def load_data(self, collection_name, projection=None, filter=None, batch_size=DEFAULT_BATCH_SIZE,
+                  dtypes=None):
         """Load data from a collection into a pandas DataFrame."""
-        collection = self.db[collection_name]
-        return pd.DataFrame(list(collection.find()))
+        return load_frame(self.db[collection_name], projection, filter, batch_size, dtypes)
+
+    def iter_data(self, collection_name, projection=None, filter=None, batch_size=DEFAULT_BATCH_SIZE,
+                  dtypes=None):
+        """Yield the data of a collection as one pandas DataFrame per cursor batch."""
+        return iter_frames(self.db[collection_name], projection, filter, batch_size, dtypes)
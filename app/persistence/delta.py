@@ -0,0 +1,85 @@
+import hashlib
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+MANIFEST_VERSION = 1
+FINGERPRINT_BLOCK_SIZE = 1 << 20
+
+
+def default_manifest_path(path):
+    """Return where the manifest of a CSV file or shard directory is kept by default."""
+    return os.path.join(path, '.ingest_manifest.json') if os.path.isdir(path) else f"{path}.manifest.json"
+
+
+def load_manifest(path):
+    """Read a manifest, or return an empty one if the file does not exist yet."""
+    if not os.path.exists(path):
+        return {'version': MANIFEST_VERSION, 'files': {}}
+    with open(path, 'r', encoding='utf-8') as file:
+        manifest = json.load(file)
+    if manifest.get('version') != MANIFEST_VERSION:
+        # Hashes of another format can't be compared, every row is treated as changed
+        return {'version': MANIFEST_VERSION, 'files': {}}
+    return manifest
+
+
+def save_manifest(path, manifest):
+    """Write a manifest atomically, so an interrupted run keeps the previous one."""
+    temporary = f"{path}.tmp"
+    with open(temporary, 'w', encoding='utf-8') as file:
+        json.dump(manifest, file)
+    os.replace(temporary, path)
+
+
+def file_stat(csv_file):
+    """Return the size and modification time of a file."""
+    stat = os.stat(csv_file)
+    return {'size': stat.st_size, 'mtime': stat.st_mtime_ns}
+
+
+def file_checksum(csv_file):
+    """Return the sha256 hex digest of a file's content."""
+    digest = hashlib.sha256()
+    with open(csv_file, 'rb') as handle:
+        for block in iter(lambda: handle.read(FINGERPRINT_BLOCK_SIZE), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def file_unchanged(entry, stat, csv_file):
+    """Tell whether a file still matches its manifest entry.
+
+    Size and modification time are compared first; a file whose mtime changed is
+    only hashed to rule out a touch without content changes.
+    Returns (unchanged, checksum), checksum being None when it wasn't computed.
+    """
+    if entry is None or entry['size'] != stat['size']:
+        return False, None
+    if entry['mtime'] == stat['mtime']:
+        return True, entry['sha256']
+    checksum = file_checksum(csv_file)
+    return checksum == entry['sha256'], checksum
+
+
+def row_hashes(chunk: pd.DataFrame, unique_key) -> pd.Series:
+    """Return a 64-bit content hash of every row of a raw CSV chunk, indexed by unique key.
+
+    Rows without a unique key can't be tracked and are left out.
+    """
+    keyed = chunk[chunk[unique_key].notna()]
+    hashes = pd.util.hash_pandas_object(keyed, index=False)
+    hashes = pd.Series(hashes.to_numpy(), index=keyed[unique_key].astype(str).to_numpy())
+    return hashes[~hashes.index.duplicated(keep='last')]
+
+
+def changed_rows_mask(chunk: pd.DataFrame, hashes: pd.Series, previous: dict, unique_key) -> pd.Series:
+    """Return a mask of the chunk rows that are new or whose hash differs from the manifest."""
+    # Built as Python ints: Index.map would turn the 64-bit hashes into floats as soon as one key is new
+    stored = np.array([previous.get(key) for key in hashes.index], dtype=object)
+    changed = pd.Series(stored != hashes.to_numpy().astype(object), index=hashes.index)
+    keys = chunk[unique_key].astype(str)
+    # Rows without a key are kept so cleaning rejects them as usual
+    return keys.map(changed).fillna(True).astype(bool) | chunk[unique_key].isna()
@@ -0,0 +1,84 @@
+import bson
+import pandas as pd
+
+DEFAULT_BATCH_SIZE = 1000
+
+
+class ColumnBuffers:
+    """Accumulate decoded documents directly into one list per column."""
+
+    def __init__(self, columns=None):
+        # With a known projection the columns are fixed; otherwise they are discovered
+        self.fixed = columns is not None
+        self.columns = {column: [] for column in columns or []}
+        self.rows = 0
+
+    def extend(self, raw_batch):
+        """Decode a raw BSON batch and append every document to the column buffers."""
+        for document in bson.decode_iter(raw_batch):
+            if not self.fixed:
+                for column in document:
+                    if column not in self.columns:
+                        # Backfill a column first seen after earlier documents
+                        self.columns[column] = [None] * self.rows
+            for column, values in self.columns.items():
+                values.append(_get_path(document, column))
+            self.rows += 1
+
+    def to_frame(self, dtypes=None):
+        """Build a DataFrame from the buffers, casting the columns listed in dtypes."""
+        frame = pd.DataFrame(self.columns, columns=list(self.columns))
+        if dtypes:
+            frame = frame.astype({column: dtype for column, dtype in dtypes.items()
+                                  if column in frame.columns})
+        return frame
+
+
+def projected_columns(projection):
+    """Return the columns an inclusion projection yields, or None if they aren't known upfront."""
+    if projection is None:
+        return None
+    if not isinstance(projection, dict):
+        projection = {field: 1 for field in projection}
+    included = [field for field, value in projection.items() if value and field != '_id']
+    if not included:
+        return None  # Exclusion projection, the remaining fields are only known from the data
+    if projection.get('_id', 1):
+        included.insert(0, '_id')
+    return included
+
+
+def iter_frames(collection, projection=None, filter=None, batch_size=DEFAULT_BATCH_SIZE, dtypes=None):
+    """Yield one DataFrame per cursor batch of the collection.
+
+    Batches are fetched as raw BSON and decoded straight into column buffers,
+    only the projected fields are transferred from the server.
+    """
+    columns = projected_columns(projection)
+    cursor = collection.find_raw_batches(filter or {}, projection, batch_size=batch_size)
+    for raw_batch in cursor:
+        buffers = ColumnBuffers(columns)
+        buffers.extend(raw_batch)
+        yield buffers.to_frame(dtypes)
+
+
+def load_frame(collection, projection=None, filter=None, batch_size=DEFAULT_BATCH_SIZE, dtypes=None):
+    """Load the matching documents of the collection into a single DataFrame."""
+    buffers = ColumnBuffers(projected_columns(projection))
+    cursor = collection.find_raw_batches(filter or {}, projection, batch_size=batch_size)
+    for raw_batch in cursor:
+        buffers.extend(raw_batch)
+    return buffers.to_frame(dtypes)
+
+
+def _get_path(document, path):
+    """Return the value at a dotted path of a decoded document, or None if it is missing."""
+    value = document.get(path)
+    if value is not None or '.' not in path:
+        return value
+    value = document
+    for part in path.split('.'):
+        if not isinstance(value, dict):
+            return None
+        value = value.get(part)
+    return value
@@ -0,0 +1,21 @@
+import pandas as pd
+
+from app.persistence.people import PEOPLE_COLUMNS, PEOPLE_DELIMITER, split_people
+
+
+def split_people_column(values: pd.Series) -> pd.Series:
+    """Split a whole credit column into lists of names."""
+    people = values.astype(object).str.split(PEOPLE_DELIMITER)
+    people = people.where(people.notna(), values)  # Values that are already lists stay as they are
+    return people.map(split_people)
+
+
+def normalize_people(data: pd.DataFrame) -> pd.DataFrame:
+    """Return the DataFrame with its credit columns stored as lists of names."""
+    return data.assign(**{column: split_people_column(data[column])
+                          for column in PEOPLE_COLUMNS if column in data.columns})
+
+
+def distinct_people(values: pd.Series):
+    """Return the distinct names of a credit column holding lists of names."""
+    return set(values.explode().dropna().unique())
@@ -0,0 +1,226 @@
+import glob
+import io
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+from app.persistence import connection
+from app.persistence.bulk import merge_summary, new_summary
+from app.persistence.normalization import distinct_people, normalize_people
+from app.utilities.instrumentation import metrics
+
+READ_BLOCK_SIZE = 1 << 20
+
+
+def csv_inputs(path):
+    """Return the CSV files to ingest: the file itself or every .csv shard of a directory."""
+    if os.path.isdir(path):
+        return sorted(glob.glob(os.path.join(path, '*.csv')))
+    return [path]
+
+
+def read_header(csv_file):
+    """Return the header line of a CSV file as bytes, including its line terminator."""
+    with open(csv_file, 'rb') as handle:
+        return handle.readline()
+
+
+def partition_csv(csv_file, partitions):
+    """Split the data rows of a CSV file into at most `partitions` byte ranges.
+
+    Boundaries are moved forward to the next record start outside a quoted field,
+    so a partition never cuts through a multi-line value.
+    Returns a list of (start, end) byte offsets.
+    """
+    data_start = len(read_header(csv_file))
+    file_size = os.path.getsize(csv_file)
+    step = (file_size - data_start) / max(partitions, 1)
+    targets = [int(data_start + step * i) for i in range(1, partitions)]
+    boundaries = [data_start] + find_record_starts(csv_file, data_start, targets, file_size) + [file_size]
+    return [(start, end) for start, end in zip(boundaries, boundaries[1:]) if end > start]
+
+
+def find_record_starts(csv_file, data_start, targets, file_size):
+    """Return, for each sorted target offset, the first record start after it.
+
+    Quote parity is tracked from data_start with block-wise counts, so only the
+    newlines near each target are inspected one by one.
+    """
+    starts = []
+    remaining = sorted(targets)
+    in_quotes = False
+    searching = False
+    position = data_start
+    with open(csv_file, 'rb') as handle:
+        handle.seek(data_start)
+        while remaining:
+            block = handle.read(READ_BLOCK_SIZE)
+            if not block:
+                break
+            offset = 0
+            while True:
+                if not searching:
+                    if not remaining or remaining[0] >= position + len(block):
+                        in_quotes ^= block.count(b'"', offset) % 2 == 1
+                        break
+                    target = max(remaining[0] - position, offset)
+                    in_quotes ^= block.count(b'"', offset, target) % 2 == 1
+                    offset = target
+                    searching = True
+                newline = block.find(b'\n', offset)
+                if newline == -1:
+                    in_quotes ^= block.count(b'"', offset) % 2 == 1
+                    break
+                in_quotes ^= block.count(b'"', offset, newline) % 2 == 1
+                offset = newline + 1
+                if not in_quotes:
+                    record_start = position + offset
+                    while remaining and remaining[0] < record_start:
+                        starts.append(record_start)
+                        remaining.pop(0)
+                    searching = False
+            position += len(block)
+    # Targets past the last record start mark the end of the file
+    return starts + [file_size] * len(remaining)
+
+
+def counter_values():
+    """Return the counters of the metrics registry keyed by (name, sorted labels)."""
+    return {(counter['name'], tuple(sorted(counter['labels'].items()))): counter['value']
+            for counter in metrics.snapshot()['counters']}
+
+
+def counters_since(before):
+    """Return what the counters added since before (a counter_values() result), listed like snapshot()."""
+    return [{'name': name, 'labels': dict(labels), 'value': value - before.get((name, labels), 0)}
+            for (name, labels), value in counter_values().items() if value != before.get((name, labels), 0)]
+
+
+def ingest_partition(task):
+    """Parse, clean and write one byte range of a CSV file with the worker's own client.
+
+    The counters the partition added to the worker's metrics registry are returned
+    with the result, since the parent can't see a spawned process's registry.
+    """
+    from app.persistence.database import Database
+
+    started = time.perf_counter()
+    if task['metrics']:
+        metrics.enable()
+    counted = counter_values()
+    connection.apply_settings(task['settings'])
+    db = Database(task['db_name'], task['uri'])
+
+    with open(task['csv_file'], 'rb') as handle:
+        handle.seek(task['start'])
+        body = handle.read(task['end'] - task['start'])
+
+    rows = 0
+    summary = new_summary()
+    directors = set()
+    with pd.read_csv(io.BytesIO(task['header'] + body), chunksize=task['chunksize']) as reader:
+        for chunk in reader:
+            rows += len(chunk)
+            metrics.incr('rows_read', len(chunk))
+            cleaned_data = normalize_people(db.clean_data(chunk))
+            merge_summary(summary, db.insert_data(cleaned_data.to_dict(orient='records'),
+                                                  task['collection_name'], task['unique_key'],
+                                                  batch_size=task['batch_size'], ordered=task['ordered']))
+            if 'Director' in cleaned_data.columns:
+                directors.update(distinct_people(cleaned_data['Director']))
+
+    seconds = time.perf_counter() - started
+    return {
+        'worker': os.getpid(),
+        'csv_file': task['csv_file'],
+        'start': task['start'],
+        'end': task['end'],
+        'rows': rows,
+        'seconds': seconds,
+        'rows_per_second': rows / seconds if seconds else 0.0,
+        'summary': summary,
+        'directors': directors,
+        'counters': counters_since(counted),
+    }
+
+
+def ingest_parallel(path, db_name, collection_name='movies', unique_key='IMDB ID', workers=None, uri=None,
+                    partitions_per_worker=2, chunksize=10000, batch_size=1000, ordered=False):
+    """Ingest a CSV file, or a directory of CSV shards, with a pool of worker processes.
+
+    Every input is split into byte-range partitions that workers parse, clean and
+    write with their own client. Directors are merged and written once at the end,
+    and the row counters of the workers are added to this process's metrics.
+    Change listeners of a Database are not run in the workers, so materialized
+    aggregates should be rebuilt afterwards (create_views(materialized=True)).
+    Returns a report with the merged summaries and per-worker throughput.
+    """
+    from app.persistence.database import Database
+
+    workers = workers or os.cpu_count() or 1
+    files = csv_inputs(path)
+    sizes = {csv_file: os.path.getsize(csv_file) for csv_file in files}
+    total_size = sum(sizes.values()) or 1
+    total_partitions = workers * partitions_per_worker
+
+    tasks = []
+    for csv_file in files:
+        header = read_header(csv_file)
+        partitions = max(1, round(total_partitions * sizes[csv_file] / total_size))
+        for start, end in partition_csv(csv_file, partitions):
+            tasks.append({
+                'csv_file': csv_file, 'header': header, 'start': start, 'end': end,
+                'db_name': db_name, 'uri': uri, 'settings': connection.settings(), 'metrics': metrics.enabled,
+                'collection_name': collection_name, 'unique_key': unique_key,
+                'chunksize': chunksize, 'batch_size': batch_size, 'ordered': ordered,
+            })
+
+    if collection_name == 'movies':
+        Database(db_name, uri).ensure_movie_indexes(collection_name)
+
+    started = time.perf_counter()
+    # pymongo clients are not fork-safe, so workers are spawned fresh
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context) as executor:
+        partitions = list(executor.map(ingest_partition, tasks))
+
+    summary = new_summary()
+    directors = set()
+    per_worker = {}
+    for partition in partitions:
+        merge_summary(summary, partition['summary'])
+        directors.update(partition.pop('directors'))
+        for counter in partition.pop('counters'):
+            metrics.incr(counter['name'], counter['value'], **counter['labels'])
+        worker = per_worker.setdefault(partition['worker'], {'rows': 0, 'seconds': 0.0, 'partitions': 0})
+        worker['rows'] += partition['rows']
+        worker['seconds'] += partition['seconds']
+        worker['partitions'] += 1
+    for worker in per_worker.values():
+        worker['rows_per_second'] = worker['rows'] / worker['seconds'] if worker['seconds'] else 0.0
+
+    summaries = {collection_name: summary}
+    if collection_name == 'movies':
+        director_data = [{'name': director} for director in directors]
+        summaries['directors'] = Database(db_name, uri).insert_data(director_data, 'directors', 'name',
+                                                                     batch_size=batch_size, ordered=ordered)
+
+    seconds = time.perf_counter() - started
+    rows = sum(partition['rows'] for partition in partitions)
+    for pid, worker in sorted(per_worker.items()):
+        print(f"Worker {pid}: {worker['rows']} rows in {worker['partitions']} partitions, "
+              f"{worker['rows_per_second']:.0f} rows/s")
+    print(f"Ingested {rows} rows with {len(per_worker)} workers in {seconds:.2f}s "
+          f"({rows / seconds if seconds else 0.0:.0f} rows/s)")
+
+    return {
+        'summaries': summaries,
+        'rows': rows,
+        'seconds': seconds,
+        'rows_per_second': rows / seconds if seconds else 0.0,
+        'workers': per_worker,
+        'partitions': partitions,
+    }
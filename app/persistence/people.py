@@ -0,0 +1,13 @@
+# Plain-Python credit helpers, kept out of normalization so importing them does not load pandas
+# Credit columns stored as arrays of names, delimited by PEOPLE_DELIMITER in the CSV
+PEOPLE_COLUMNS = ['Director', 'Writers', 'Cast']
+PEOPLE_DELIMITER = '|'
+
+
+def split_people(value):
+    """Return the list of names held by a credit value (a delimited string or a list)."""
+    if isinstance(value, list):
+        return value
+    if isinstance(value, str):
+        return [name.strip() for name in value.split(PEOPLE_DELIMITER) if name.strip()]
+    return []
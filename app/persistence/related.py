@@ -0,0 +1,171 @@
+import numpy as np
+import pandas as pd
+from pymongo import DeleteMany, ReplaceOne
+from scipy import sparse
+
+from app.persistence.compact import COMPACT_DTYPES, CompactMovieFrame
+from app.persistence.normalization import PEOPLE_COLUMNS, split_people
+
+RELATED_MOVIES = 'related_movies'
+# Weight of one shared person per credit column; a shared director counts for three shared actors
+CREDIT_WEIGHTS = {'Director': 3.0, 'Writers': 2.0, 'Cast': 1.0}
+DEFAULT_NEIGHBOURS = 10
+DEFAULT_BLOCK_SIZE = 1024
+# Products of square roots are off by an ulp (sqrt(2) ** 2 == 2.0000000000000004); scores are rounded to this
+SCORE_DECIMALS = 6
+
+
+def people_matrix(people, weights=None) -> sparse.csr_matrix:
+    """Stack the credit columns of a CompactMovieFrame into one sparse movie x person matrix.
+
+    Entries are the square roots of the column weights, so the product of two
+    rows is the weighted number of people the two movies share (up to rounding,
+    see SCORE_DECIMALS).
+    """
+    blocks = []
+    for column, weight in (weights or CREDIT_WEIGHTS).items():
+        csr = people[column]
+        data = np.ones(len(csr.codes), dtype=np.float64)
+        block = sparse.csr_matrix((data, csr.codes, csr.offsets), shape=(len(csr), len(csr.categories)))
+        block.sum_duplicates()  # A name credited twice on a movie counts once
+        block.data[:] = np.sqrt(weight)
+        blocks.append(block)
+    return sparse.hstack(blocks, format='csr')
+
+
+def top_neighbours(matrix, rows=None, k=DEFAULT_NEIGHBOURS, block_size=DEFAULT_BLOCK_SIZE):
+    """Yield (row, neighbour rows, scores) with the k best scored other movies of each row.
+
+    Similarities are computed as sparse products of block_size rows against the
+    whole matrix, so memory is bounded by the block and not by the catalog.
+    """
+    rows = np.arange(matrix.shape[0]) if rows is None else np.asarray(rows)
+    transposed = matrix.T.tocsc()
+    for start in range(0, len(rows), block_size):
+        block_rows = rows[start:start + block_size]
+        scores = (matrix[block_rows] @ transposed).tocsr()
+        for i, row in enumerate(block_rows):
+            columns = scores.indices[scores.indptr[i]:scores.indptr[i + 1]]
+            values = scores.data[scores.indptr[i]:scores.indptr[i + 1]].round(SCORE_DECIMALS)
+            keep = columns != row
+            columns, values = columns[keep], values[keep]
+            if len(values) > k:
+                # Keep every candidate tied with the k-th best score, so the cut below follows catalog order
+                cutoff = -np.partition(-values, k - 1)[k - 1]
+                best = values >= cutoff
+                columns, values = columns[best], values[best]
+            order = np.lexsort((columns, -values))[:k]  # Best score first, then catalog order
+            yield row, columns[order], values[order]
+
+
+class RelatedMoviesIndex:
+    """Movies ranked by the directors, writers and cast they share, precomputed per movie.
+
+    build() computes the top-k neighbours of every movie offline and stores them in
+    a collection keyed by IMDB ID, so related() is a single read by _id. As a
+    change listener it collects the movies an ingestion touched and flush()
+    recomputes only the rows those changes can affect.
+    """
+
+    def __init__(self, db, source='movies', k=DEFAULT_NEIGHBOURS, block_size=DEFAULT_BLOCK_SIZE, weights=None):
+        self.db = db
+        self.source = source
+        self.k = k
+        self.block_size = block_size
+        self.weights = weights or CREDIT_WEIGHTS
+        self.collection = db[RELATED_MOVIES]
+        self._changed_ids = set()
+        self._changed_people = {column: set() for column in self.weights}
+
+    def build(self):
+        """Recompute the neighbours of every movie and swap them in as the related collection."""
+        compact = CompactMovieFrame.load(self.db[self.source])
+        building = self.db[f"{RELATED_MOVIES}_build"]
+        building.drop()
+        batch = []
+        for document in self._documents(compact):
+            batch.append(document)
+            if len(batch) == self.block_size:
+                building.insert_many(batch, ordered=False)
+                batch = []
+        if batch:
+            building.insert_many(batch, ordered=False)
+        if len(compact):
+            building.rename(RELATED_MOVIES, dropTarget=True)
+        else:
+            self.collection.drop()
+        print(f"Related movies built for {len(compact)} movies.")
+
+    def related(self, imdb_id):
+        """Return the related movies of imdb_id, best first (empty if unknown)."""
+        document = self.collection.find_one({'_id': imdb_id}, {'related': 1})
+        return document['related'] if document else []
+
+    def on_change(self, collection_name, added, removed):
+        """Remember the movies written to the source collection and the people they credit."""
+        if collection_name != self.source:
+            return
+        for movie in list(added) + list(removed):
+            self._changed_ids.add(movie.get('IMDB ID'))
+            for column, names in self._changed_people.items():
+                names.update(split_people(movie.get(column)))
+
+    def flush(self):
+        """Refresh the related rows of the changed movies and of every movie sharing a person with them."""
+        if not self._changed_ids:
+            return
+        changed_ids = [imdb_id for imdb_id in self._changed_ids if imdb_id is not None]
+        affected = self._fetch(self._sharing_query(self._changed_people, changed_ids))
+        if len(affected):
+            # Any movie sharing a person with an affected one can become its neighbour
+            affected_people = {column: set(affected.people[column].categories) for column in self.weights}
+            affected_ids = set(_imdb_ids(affected.frame))
+            candidates = self._fetch(self._sharing_query(affected_people, affected_ids))
+            rows = [position for position, imdb_id in enumerate(_imdb_ids(candidates.frame))
+                    if imdb_id in affected_ids]
+            requests = [ReplaceOne({'_id': document['_id']}, document, upsert=True)
+                        for document in self._documents(candidates, rows)]
+        else:
+            affected_ids = set()
+            requests = []
+        # Movies that were deleted from the source lose their row
+        deleted = [imdb_id for imdb_id in changed_ids if imdb_id not in affected_ids]
+        if deleted:
+            requests.append(DeleteMany({'_id': {'$in': deleted}}))
+        if requests:
+            self.collection.bulk_write(requests, ordered=False)
+        print(f"Related movies refreshed for {len(affected_ids)} movies.")
+
+        self._changed_ids.clear()
+        for names in self._changed_people.values():
+            names.clear()
+
+    def _documents(self, compact, rows=None):
+        """Yield the related document of the given rows (all by default) of a compact frame."""
+        imdb_ids = _imdb_ids(compact.frame)
+        titles = compact.frame['Title'].tolist()
+        matrix = people_matrix(compact.people, self.weights)
+        for row, neighbours, scores in top_neighbours(matrix, rows, self.k, self.block_size):
+            yield {
+                '_id': imdb_ids[row],
+                'title': titles[row],
+                'related': [{'imdb_id': imdb_ids[neighbour], 'title': titles[neighbour], 'score': float(score)}
+                            for neighbour, score in zip(neighbours, scores)],
+            }
+
+    def _sharing_query(self, people, imdb_ids=()):
+        """Return the filter of the movies crediting any of people (by column) or listed in imdb_ids."""
+        clauses = [{column: {'$in': sorted(names)}} for column, names in people.items() if names]
+        if imdb_ids:
+            clauses.append({'IMDB ID': {'$in': list(imdb_ids)}})
+        return {'$or': clauses} if clauses else None
+
+    def _fetch(self, query):
+        """Load the movies matching query as a CompactMovieFrame (empty without a query)."""
+        columns = ['Title', 'IMDB ID'] + list(COMPACT_DTYPES) + PEOPLE_COLUMNS
+        documents = [] if query is None else list(self.db[self.source].find(query, {column: 1 for column in columns}))
+        return CompactMovieFrame.from_frame(pd.DataFrame(documents).reindex(columns=columns))
+
+
+def _imdb_ids(frame):
+    return [f"tt{number:07d}" for number in frame['imdb_number']]
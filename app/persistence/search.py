@@ -0,0 +1,91 @@
+import base64
+import re
+
+from bson import json_util
+from pymongo import ASCENDING, TEXT
+
+TEXT_INDEX_NAME = 'movie_text'
+# Title matches count more than Summary matches in the relevance score
+TEXT_WEIGHTS = {'Title': 10, 'Summary': 1}
+PEOPLE_FIELDS = ['Director', 'Cast']
+DEFAULT_PAGE_SIZE = 20
+
+
+def encode_cursor(position):
+    """Encode a paging position (a list of sort values) into an opaque URL-safe token."""
+    return base64.urlsafe_b64encode(json_util.dumps(position).encode('utf-8')).decode('ascii')
+
+
+def decode_cursor(token):
+    try:
+        return json_util.loads(base64.urlsafe_b64decode(token.encode('ascii')))
+    except ValueError as e:
+        raise ValueError(f"Invalid search cursor: {token!r}") from e
+
+
+class MovieSearch:
+    """Full-text and name-prefix search over a movies collection, with cursor-based paging.
+
+    Words of Title and Summary are looked up in a text index and ranked by text
+    score. Director and Cast prefixes are anchored, case-sensitive regular
+    expressions, which MongoDB answers from the multikey indexes on those arrays.
+    Each call returns {'results': [...], 'next_cursor': token or None}; passing the
+    token back returns the following page without re-reading the skipped ones.
+    """
+
+    def __init__(self, collection):
+        self.collection = collection
+
+    def ensure_indexes(self):
+        """Create the text index and the people indexes the searches rely on."""
+        self.collection.create_index([(field, TEXT) for field in TEXT_WEIGHTS], weights=TEXT_WEIGHTS,
+                                     name=TEXT_INDEX_NAME)
+        for field in PEOPLE_FIELDS:
+            self.collection.create_index([(field, ASCENDING)])
+
+    def text(self, query, limit=DEFAULT_PAGE_SIZE, cursor=None, projection=None):
+        """Return the movies matching the words of query, best text score first."""
+        pipeline = [
+            {"$match": {"$text": {"$search": query}}},
+            {"$addFields": {"score": {"$meta": "textScore"}}},
+        ]
+        if cursor is not None:
+            score, last_id = decode_cursor(cursor)
+            # Resume after the last result of the previous page: lower score, or same score and later _id
+            pipeline.append({"$match": {"$or": [{"score": {"$lt": score}},
+                                                {"score": score, "_id": {"$gt": last_id}}]}})
+        pipeline.extend([
+            {"$sort": {"score": -1, "_id": 1}},
+            {"$limit": limit + 1},
+        ])
+        if projection:
+            pipeline.append({"$project": _keep_position(projection, 'score')})
+        documents = list(self.collection.aggregate(pipeline))
+        return _page(documents, limit, lambda document: [document['score'], document['_id']])
+
+    def people(self, prefix, fields=None, limit=DEFAULT_PAGE_SIZE, cursor=None, projection=None):
+        """Return the movies crediting a Director or Cast name starting with prefix, in _id order."""
+        pattern = f"^{re.escape(prefix)}"
+        query = {"$or": [{field: {"$regex": pattern}} for field in fields or PEOPLE_FIELDS]}
+        if cursor is not None:
+            (last_id,) = decode_cursor(cursor)
+            query = {"$and": [query, {"_id": {"$gt": last_id}}]}
+        if projection:
+            projection = _keep_position(projection)
+        documents = list(self.collection.find(query, projection).sort('_id', ASCENDING).limit(limit + 1))
+        return _page(documents, limit, lambda document: [document['_id']])
+
+
+def _keep_position(projection, *fields):
+    """Make sure a projection keeps _id and the given fields, which the paging cursor is built from."""
+    projection = {**projection, '_id': 1}
+    if any(value for key, value in projection.items() if key != '_id'):
+        projection.update((field, 1) for field in fields)  # Inclusion projection
+    return projection
+
+
+def _page(documents, limit, position):
+    """Cut one extra fetched document off a page and turn the last kept one into the next cursor."""
+    results = documents[:limit]
+    next_cursor = encode_cursor(position(results[-1])) if len(documents) > limit else None
+    return {'results': results, 'next_cursor': next_cursor}
@@ -0,0 +1,241 @@
+import gzip
+import json
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import bson
+from bson.raw_bson import RawBSONDocument
+from pymongo.errors import BulkWriteError
+
+from app.persistence.aggregates import MaterializedAggregates, accumulators_exist
+from app.persistence.bulk import ensure_unique_index
+from app.persistence.data_processor import VIEW_NAMES, VIEW_PIPELINES, view_definition
+from app.persistence.loader import DEFAULT_BATCH_SIZE, iter_frames
+
+MANIFEST_FILE = 'manifest.json'
+SNAPSHOT_COLLECTIONS = ['movies', 'directors'] + VIEW_NAMES
+# Unique key of each restored collection, indexed before documents are loaded
+UNIQUE_KEYS = {'movies': 'IMDB ID', 'directors': 'name'}
+# gzip level of .bson.gz files: level 1 compresses several times faster than the default 9
+# and the files are only slightly larger
+GZIP_LEVEL = 1
+
+# Parquet column types of the collections whose shape is known, so every batch is written with one schema
+PARQUET_TYPES = {
+    'movies': {
+        'Title': 'string', 'Year': 'int64', 'Summary': 'string', 'Short Summary': 'string',
+        'IMDB ID': 'string', 'Runtime': 'int64', 'YouTube Trailer': 'string', 'Rating': 'float64',
+        'Movie Poster': 'string', 'Director': 'list', 'Writers': 'list', 'Cast': 'list',
+    },
+    'directors': {'name': 'string'},
+}
+
+
+def _import_pyarrow():
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError as e:
+        raise ImportError("Parquet snapshots require pyarrow: pip install pyarrow") from e
+    return pa, pq
+
+
+def _open(path, mode, compresslevel=GZIP_LEVEL):
+    """Open a snapshot file, gzip-compressed when its name ends in .gz."""
+    return gzip.open(path, mode, compresslevel=compresslevel) if path.endswith('.gz') else open(path, mode)
+
+
+def _count_documents(raw_batch):
+    """Count the documents of a raw BSON batch from their length prefixes, without decoding them."""
+    count = position = 0
+    while position < len(raw_batch):
+        position += int.from_bytes(raw_batch[position:position + 4], 'little')
+        count += 1
+    return count
+
+
+def export_bson(collection, path, batch_size=DEFAULT_BATCH_SIZE, compresslevel=GZIP_LEVEL):
+    """Stream a collection to a file of concatenated BSON documents (the mongodump format).
+
+    Cursor batches are written as the raw bytes the server sent, so nothing is
+    decoded and memory stays at one batch. Paths ending in .gz are compressed at
+    compresslevel. Returns the number of documents.
+    """
+    documents = 0
+    with _open(path, 'wb', compresslevel) as file:
+        for raw_batch in collection.find_raw_batches({}, batch_size=batch_size):
+            file.write(raw_batch)
+            documents += _count_documents(raw_batch)
+    return documents
+
+
+def export_parquet(collection, path, batch_size=DEFAULT_BATCH_SIZE, compression='zstd'):
+    """Stream a collection to a compressed Parquet file, one row group per cursor batch.
+
+    Collections listed in PARQUET_TYPES are written with their declared columns
+    (without _id); other collections use the schema of their first batch.
+    Returns the number of documents.
+    """
+    pa, pq = _import_pyarrow()
+    schema = _declared_schema(pa, PARQUET_TYPES.get(collection.name))
+    projection = {'_id': 0} if schema is not None else None
+
+    documents = 0
+    writer = None
+    try:
+        for frame in iter_frames(collection, projection, batch_size=batch_size):
+            if '_id' in frame.columns:
+                frame['_id'] = frame['_id'].astype(str)
+            if schema is None:
+                schema = _inferred_schema(pa, frame)
+            frame = frame.reindex(columns=schema.names)
+            table = pa.Table.from_pandas(frame, schema=schema, preserve_index=False)
+            if writer is None:
+                writer = pq.ParquetWriter(path, schema, compression=compression)
+            writer.write_table(table)
+            documents += len(frame)
+        if writer is None:
+            # Keep an empty collection restorable
+            writer = pq.ParquetWriter(path, schema if schema is not None else pa.schema([]),
+                                      compression=compression)
+    finally:
+        if writer is not None:
+            writer.close()
+    return documents
+
+
+def _declared_schema(pa, types):
+    if types is None:
+        return None
+    arrow_types = {'string': pa.string(), 'int64': pa.int64(), 'float64': pa.float64(),
+                   'list': pa.list_(pa.string())}
+    return pa.schema([(column, arrow_types[kind]) for column, kind in types.items()])
+
+
+def _inferred_schema(pa, frame):
+    """Infer a schema from a first batch; columns with only missing values are written as strings."""
+    schema = pa.Schema.from_pandas(frame, preserve_index=False)
+    return pa.schema([field.with_type(pa.string()) if pa.types.is_null(field.type) else field
+                      for field in schema])
+
+
+def export_snapshot(db, directory, format='bson', collections=None, batch_size=DEFAULT_BATCH_SIZE,
+                    compress=True, compression='zstd', compresslevel=GZIP_LEVEL):
+    """Export collections and views of a database to a snapshot directory.
+
+    Every collection goes to its own .bson (.bson.gz at compresslevel with
+    compress=True) or .parquet file, and a manifest lists the files with their
+    document counts. Views are exported with their current results, and the
+    manifest records whether they were materialized. Returns the manifest.
+    """
+    os.makedirs(directory, exist_ok=True)
+    existing = set(db.list_collection_names())
+    manifest = {'format': format, 'created': time.time(), 'collections': {},
+                'materialized_views': accumulators_exist(existing)}
+    for name in collections or SNAPSHOT_COLLECTIONS:
+        if name not in existing:
+            continue
+        if format == 'parquet':
+            file_name = f"{name}.parquet"
+            documents = export_parquet(db[name], os.path.join(directory, file_name), batch_size, compression)
+        else:
+            file_name = f"{name}.bson.gz" if compress else f"{name}.bson"
+            documents = export_bson(db[name], os.path.join(directory, file_name), batch_size, compresslevel)
+        manifest['collections'][name] = {'file': file_name, 'documents': documents,
+                                         'view': name in VIEW_PIPELINES}
+        print(f"Exported {documents} documents from {name} to {file_name}")
+
+    with open(os.path.join(directory, MANIFEST_FILE), 'w', encoding='utf-8') as file:
+        json.dump(manifest, file, indent=2)
+    return manifest
+
+
+def iter_bson_batches(path, batch_size=DEFAULT_BATCH_SIZE):
+    """Yield lists of undecoded documents read from a BSON snapshot file."""
+    options = bson.CodecOptions(document_class=RawBSONDocument)
+    batch = []
+    with _open(path, 'rb') as file:
+        for document in bson.decode_file_iter(file, options):
+            batch.append(document)
+            if len(batch) == batch_size:
+                yield batch
+                batch = []
+    if batch:
+        yield batch
+
+
+def iter_parquet_batches(path, batch_size=DEFAULT_BATCH_SIZE):
+    """Yield lists of documents read from a Parquet snapshot file, missing values left out."""
+    _, pq = _import_pyarrow()
+    parquet_file = pq.ParquetFile(path)
+    for record_batch in parquet_file.iter_batches(batch_size=batch_size):
+        yield [{key: value for key, value in row.items() if value is not None}
+               for row in record_batch.to_pylist()]
+
+
+def restore_collection(collection, batches, workers=4):
+    """Insert batches of documents with a pool of threads; returns the number inserted.
+
+    At most two batches per worker are read ahead, so memory stays bounded
+    whatever the size of the snapshot.
+    """
+    inserted = 0
+    pending = set()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for batch in batches:
+            if len(pending) >= workers * 2:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                inserted += sum(future.result() for future in done)
+            pending.add(executor.submit(_insert_batch, collection, batch))
+        inserted += sum(future.result() for future in pending)
+    return inserted
+
+
+def _insert_batch(collection, batch):
+    """Insert one batch, skipping documents whose unique key is already stored."""
+    try:
+        return len(collection.insert_many(batch, ordered=False).inserted_ids)
+    except BulkWriteError as e:
+        if any(error['code'] != 11000 for error in e.details['writeErrors']):
+            raise
+        return e.details['nInserted']
+
+
+def restore_snapshot(db, directory, collections=None, workers=4, batch_size=DEFAULT_BATCH_SIZE, drop=True):
+    """Load the collections of a snapshot directory back into a database.
+
+    Collections are dropped first unless drop=False. Views aren't loaded as
+    data: they are recreated from their pipelines over the restored movies, and
+    views that were materialized get their accumulators rebuilt and read them again.
+    Returns a dict mapping each restored collection to its document count.
+    """
+    with open(os.path.join(directory, MANIFEST_FILE), encoding='utf-8') as file:
+        manifest = json.load(file)
+
+    restored = {}
+    views = []
+    for name, entry in manifest['collections'].items():
+        if collections is not None and name not in collections:
+            continue
+        if entry.get('view'):
+            views.append(name)
+            continue
+        path = os.path.join(directory, entry['file'])
+        if drop:
+            db.drop_collection(name)
+        if name in UNIQUE_KEYS:
+            ensure_unique_index(db[name], UNIQUE_KEYS[name])
+        batches = (iter_parquet_batches(path, batch_size) if path.endswith('.parquet')
+                   else iter_bson_batches(path, batch_size))
+        restored[name] = restore_collection(db[name], batches, workers)
+        print(f"Restored {restored[name]} documents into {name}")
+
+    materialized = manifest.get('materialized_views', False)
+    if views and materialized:
+        MaterializedAggregates(db).rebuild()
+    for view in views:
+        db.drop_collection(view)
+        source, pipeline = view_definition(view, materialized)
+        db.command('create', view, viewOn=source, pipeline=pipeline)
+    return restored
@@ -0,0 +1,62 @@
+import re
+
+import pandas as pd
+from mongoengine import FloatField, IntField, ListField, StringField, URLField
+
+# Fallback for URLField instances that don't expose their compiled pattern
+URL_PATTERN = re.compile(r'^(?:[a-z0-9.+-]*)://\S+$', re.IGNORECASE)
+
+
+def validate_frame(frame: pd.DataFrame, document_class):
+    """Check every row of frame against the field constraints of a mongoengine document class.
+
+    Columns are named after the document fields and each constraint is evaluated
+    over a whole column at once instead of validating one document at a time.
+    Returns a boolean Series of valid rows and, for the invalid rows only, a Series
+    listing the fields they failed.
+    """
+    failures = {}
+    for name, field in document_class._fields.items():
+        if name == 'id':
+            continue
+        values = frame[name] if name in frame.columns else pd.Series(None, index=frame.index, dtype=object)
+        failures[name] = ~_field_mask(field, values)
+
+    failed = pd.DataFrame(failures, index=frame.index)
+    valid = ~failed.any(axis=1)
+    errors = pd.Series([[name for name, failure in row.items() if failure]
+                        for row in failed[~valid].to_dict(orient='records')],
+                       index=failed.index[~valid.to_numpy()], dtype=object)
+    return valid, errors
+
+
+def _field_mask(field, values: pd.Series) -> pd.Series:
+    """Return a mask of the values a field accepts; missing values are accepted unless required."""
+    if isinstance(field, ListField):
+        lengths = values.map(lambda value: len(value) if isinstance(value, list) else -1)
+        return lengths.gt(0) if field.required else lengths.ge(0) | values.isna()
+
+    present = values.notna()
+    if isinstance(field, (IntField, FloatField)):
+        numbers = pd.to_numeric(values, errors='coerce')
+        valid = numbers.notna()
+        if isinstance(field, IntField):
+            valid &= numbers.eq(numbers.round())
+        if field.min_value is not None:
+            valid &= numbers.ge(field.min_value)
+        if field.max_value is not None:
+            valid &= numbers.le(field.max_value)
+    elif isinstance(field, StringField):
+        is_string = values.map(lambda value: isinstance(value, str))
+        valid = is_string
+        if field.max_length is not None:
+            valid &= values.where(is_string, '').str.len().le(field.max_length)
+        if field.min_length is not None:
+            valid &= values.where(is_string, '').str.len().ge(field.min_length)
+        if isinstance(field, URLField):
+            pattern = getattr(field, 'url_regex', URL_PATTERN)
+            valid &= values.where(is_string, '').str.match(pattern)
+    else:
+        valid = pd.Series(True, index=values.index)
+
+    return valid if field.required else valid | ~present
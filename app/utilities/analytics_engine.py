@@ -0,0 +1,173 @@
+import gzip
+import heapq
+import os
+
+import numpy as np
+import pandas as pd
+
+# Result columns of each view, in the order the MongoDB views return them
+VIEW_COLUMNS = {
+    'top_5_directors_most_films': ['_id', 'film_count'],
+    'top_5_directors_rated': ['_id', 'average_rating'],
+    'top_5_directors_longest_avg_runtime': ['_id', 'average_runtime'],
+    'top_15_actors_with_movies': ['_id', 'movies', 'film_count'],
+}
+
+
+class AnalyticsEngine:
+    """Compute the director and actor top-N views in-process, without a database.
+
+    Results have the same shape as the MongoDB views created by
+    DataProcessor.create_views, so DataVisualizer can plot them directly.
+    """
+
+    def __init__(self, data: pd.DataFrame, director_limit=5, actor_limit=15, people=None):
+        """people optionally maps Director and Cast to PeopleCSR codes (see CompactMovieFrame)."""
+        self.data = data
+        self.people = people or {}
+        self.director_limit = director_limit
+        self.actor_limit = actor_limit
+        self._results = None
+
+    @classmethod
+    def from_snapshot(cls, path, **kwargs):
+        """Build an engine from a local CSV, Parquet, BSON, JSON lines or pickle snapshot.
+
+        path may also be a directory written by Database.export_snapshot, whose
+        movies file is then read.
+        """
+        if os.path.isdir(path):
+            path = _snapshot_movies_file(path)
+        extension = os.path.splitext(path[:-3] if path.endswith('.gz') else path)[1].lower()
+        columns = ['Title', 'Director', 'Rating', 'Runtime', 'Cast']
+        if extension == '.bson':
+            data = _read_bson(path, columns)
+        elif extension == '.parquet':
+            data = pd.read_parquet(path, columns=columns)
+        elif extension in ('.json', '.jsonl'):
+            data = pd.read_json(path, lines=True)
+        elif extension in ('.pkl', '.pickle'):
+            data = pd.read_pickle(path)
+        else:
+            data = pd.read_csv(path, usecols=lambda column: column in columns)
+        return cls(data, **kwargs)
+
+    @classmethod
+    def from_compact(cls, compact, **kwargs):
+        """Build an engine that groups directly on the integer codes of a CompactMovieFrame."""
+        return cls(compact.frame, people=compact.people, **kwargs)
+
+    def results(self) -> dict:
+        """Compute all four views in one pass and return them keyed by view name."""
+        if self._results is None:
+            self._results = {**self._director_results(), **self._actor_results()}
+        return self._results
+
+    def result(self, view_name) -> pd.DataFrame:
+        """Return the result of a single view."""
+        return self.results()[view_name]
+
+    def _director_results(self) -> dict:
+        """Group ratings and runtimes by director codes once and select the three top-N lists."""
+        positions, codes, names = self._people_codes('Director')
+
+        film_count = np.bincount(codes, minlength=len(names))
+        average_rating = _grouped_mean(codes, _numeric(self.data, 'Rating')[positions], len(names))
+        average_runtime = _grouped_mean(codes, _numeric(self.data, 'Runtime')[positions], len(names))
+
+        limit = self.director_limit
+        return {
+            'top_5_directors_most_films': _top_frame(names, film_count, limit, 'film_count'),
+            'top_5_directors_rated': _top_frame(names, average_rating, limit, 'average_rating'),
+            'top_5_directors_longest_avg_runtime': _top_frame(names, average_runtime, limit, 'average_runtime'),
+        }
+
+    def _actor_results(self) -> dict:
+        """Count films per actor code and collect the titles of the top actors only."""
+        positions, codes, names = self._people_codes('Cast')
+
+        film_count = np.bincount(codes, minlength=len(names))
+        top = _top_k(film_count, self.actor_limit)
+
+        titles = self.data['Title'].to_numpy()
+        in_top = np.isin(codes, top)
+        movies = {code: [] for code in top}
+        for code, position in zip(codes[in_top], positions[in_top]):
+            movies[code].append(titles[position])
+
+        frame = pd.DataFrame({
+            '_id': names[top],
+            'movies': [movies[code] for code in top],
+            'film_count': film_count[top],
+        }, columns=VIEW_COLUMNS['top_15_actors_with_movies'])
+        return {'top_15_actors_with_movies': frame}
+
+    def _people_codes(self, column):
+        """Return (row positions, integer codes, names) with one entry per credited person."""
+        csr = self.people.get(column)
+        if csr is not None:
+            return csr.positions(), csr.codes, csr.categories.to_numpy(dtype=object)
+        positions, people = explode_people(self.data[column])
+        codes, names = pd.factorize(people)
+        valid = codes >= 0
+        return positions[valid], codes[valid], names
+
+
+def _snapshot_movies_file(directory):
+    """Return the movies file of a snapshot directory."""
+    for file_name in ('movies.parquet', 'movies.bson.gz', 'movies.bson'):
+        path = os.path.join(directory, file_name)
+        if os.path.exists(path):
+            return path
+    raise FileNotFoundError(f"No movies file in snapshot directory {directory}")
+
+
+def _read_bson(path, columns) -> pd.DataFrame:
+    """Read the given fields of a (possibly gzipped) BSON file one document at a time."""
+    import bson
+
+    opener = gzip.open if path.endswith('.gz') else open
+    values = {column: [] for column in columns}
+    with opener(path, 'rb') as file:
+        for document in bson.decode_file_iter(file):
+            for column, column_values in values.items():
+                column_values.append(document.get(column))
+    return pd.DataFrame(values, columns=columns)
+
+
+def explode_people(values: pd.Series):
+    """Return (row positions, names) with one entry per person of a Director or Cast column.
+
+    Accepts both pipe-delimited strings and lists of names; missing names become NaN.
+    """
+    values = values.reset_index(drop=True).astype(object)
+    people = values.str.split('|')
+    people = people.where(people.notna(), values)  # Lists aren't split, they stay as they are
+    names = people.explode().astype(object).str.strip()
+    names = names.where(names != '')
+    return names.index.to_numpy(), names.to_numpy()
+
+
+def _numeric(data, column):
+    """Return a column as floats, non-numeric values becoming NaN (like $avg ignores them)."""
+    return pd.to_numeric(data[column], errors='coerce').to_numpy(dtype=float)
+
+
+def _grouped_mean(codes, values, size):
+    """Mean of values per code ignoring NaN; codes without any value get NaN."""
+    present = ~np.isnan(values)
+    sums = np.bincount(codes[present], weights=values[present], minlength=size)
+    counts = np.bincount(codes[present], minlength=size)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(counts > 0, sums / np.maximum(counts, 1), np.nan)
+
+
+def _top_k(values, k):
+    """Return the codes of the k largest values with a heap, skipping NaN."""
+    candidates = np.flatnonzero(~np.isnan(values.astype(float)))
+    return np.array(heapq.nlargest(k, candidates, key=values.__getitem__), dtype=np.int64)
+
+
+def _top_frame(names, values, k, field):
+    top = _top_k(values, k)
+    return pd.DataFrame({'_id': names[top], field: values[top]}, columns=['_id', field])
@@ -0,0 +1,67 @@
+import os
+
+
+def draw_top_5_directors_most_films(plt, data):
+    plt.figure(figsize=(10, 8))
+    plt.pie(data['film_count'], labels=data['_id'], autopct='%1.1f%%', startangle=140)
+    plt.title('Top 5 Directors by Number of Films')
+    plt.axis('equal')  # Equal aspect ratio ensures that pie is drawn as a circle.
+
+
+def draw_top_5_directors_rated(plt, data):
+    plt.figure(figsize=(10, 6))
+    plt.barh(data['_id'], data['average_rating'], color='salmon')
+    plt.title('Top 5 Directors by Average Rating')
+    plt.xlabel('Average Rating')
+    plt.ylabel('Directors')
+    plt.grid(axis='x', linestyle='--', alpha=0.7)
+    plt.tight_layout()
+
+
+def draw_director_average_runtime(plt, data):
+    plt.figure(figsize=(10, 6))
+    plt.barh(data['_id'], data['average_runtime'], color='skyblue')
+    plt.title('Average Runtime by Director')
+    plt.xlabel('Average Runtime (minutes)')
+    plt.ylabel('Directors')
+    plt.grid(axis='x', linestyle='--', alpha=0.7)
+    plt.tight_layout()
+
+
+def draw_top_15_actors_with_movies(plt, data):
+    plt.figure(figsize=(10, 6))
+    plt.scatter(data['_id'], data['film_count'], color='lightcoral', s=100)
+    plt.title('Top 15 Actors by Number of Movies')
+    plt.xlabel('Actors')
+    plt.ylabel('Number of Movies')
+    plt.xticks(rotation=45)
+    plt.grid(True)
+    plt.tight_layout()
+
+
+# Chart name -> (view it plots, fields it needs besides _id, drawing function)
+CHARTS = {
+    'top_5_directors_most_films': ('top_5_directors_most_films', ['film_count'],
+                                   draw_top_5_directors_most_films),
+    'top_5_directors_rated': ('top_5_directors_rated', ['average_rating'], draw_top_5_directors_rated),
+    'director_average_runtime': ('top_5_directors_longest_avg_runtime', ['average_runtime'],
+                                 draw_director_average_runtime),
+    'top_15_actors_with_movies': ('top_15_actors_with_movies', ['film_count'], draw_top_15_actors_with_movies),
+}
+
+
+def render_chart(task):
+    """Draw one chart with the non-interactive Agg backend and save it; runs in a worker process."""
+    chart, data, path = task
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+
+    CHARTS[chart][2](plt, data)
+    plt.savefig(path)
+    plt.close('all')
+    return path
+
+
+def chart_path(output_dir, chart, image_format, prefix=''):
+    return os.path.join(output_dir, f"{prefix}{chart}.{image_format}")
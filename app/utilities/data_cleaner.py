@@ -1,17 +1,44 @@
 import pandas as pd
-from mongoengine import connect, ValidationError
+from mongoengine import IntField
 from typing import List
 
+from app.persistence.bulk import iter_batches, merge_summary, new_summary, upsert_batch
+from app.persistence.connection import connect_mongoengine
+from app.persistence.normalization import distinct_people, split_people_column
+from app.utilities.instrumentation import metrics, timed
 from app.schemas.director import Director
 from app.schemas.movie import Movie
+from app.schemas.validation import validate_frame
+
+# Movie schema field -> cleaned CSV column
+MOVIE_COLUMNS = {
+    'title': 'Title',
+    'year': 'Year',
+    'summary': 'Summary',
+    'short_summary': 'Short Summary',
+    'imdb_id': 'IMDB ID',
+    'runtime': 'Runtime',
+    'youtube_trailer': 'YouTube Trailer',
+    'rating': 'Rating',
+    'movie_poster': 'Movie Poster',
+    'directors': 'Directors',
+    'writers': 'Writers',
+    'cast': 'Cast',
+}
+
+YOUTUBE_TRAILER_URL = 'https://www.youtube.com/watch?v='
 
 
 class MovieDataCleaner:
     def __init__(self, filepath, mongo_uri, db_name):
         self.filepath = filepath
-        connect(db_name, host=mongo_uri)  # Connect to MongoDB
-        self.df = pd.read_csv(self.filepath)
+        self.invalid_rows = None
+        connect_mongoengine(db_name, mongo_uri)  # Bind mongoengine to the shared MongoDB client
+        with metrics.span('cleaner.read_csv'):
+            self.df = pd.read_csv(self.filepath)
+        metrics.incr('rows_read', len(self.df))
 
+    @timed('cleaner.clean_data')
     def clean_data(self):
         # Clean data as before...
         self.df.columns = self.df.columns.str.strip()
@@ -19,48 +46,72 @@ class MovieDataCleaner:
         self.df = self.df.dropna(subset=critical_columns)
         self.df['Year'] = self.df['Year'].astype(int, errors='raise')
         self.df = self.df.drop_duplicates(subset=['IMDB ID'])
-        # Clean directors, writers, and cast
-        self.df['Directors'] = self.df['Director'].str.split(',').apply(lambda x: [d.strip() for d in x])
-        self.df['Writers'] = self.df['Writers'].str.split(',').apply(lambda x: [w.strip() for w in x])
-        self.df['Cast'] = self.df['Cast'].str.split(',').apply(lambda x: [c.strip() for c in x])
-        self.df['Directors'] = self.df['Directors'].apply(lambda x: list(set(x)))
+        # Clean directors, writers, and cast with the same delimiter as database ingestion
+        self.df['Directors'] = split_people_column(self.df['Director'])
+        self.df['Writers'] = split_people_column(self.df['Writers'])
+        self.df['Cast'] = split_people_column(self.df['Cast'])
+        self.df['Directors'] = self.df['Directors'].apply(lambda x: list(dict.fromkeys(x)))
         return self.df
 
-    def save_cleaned_data(self, output_filepath):
+    @timed('cleaner.save_cleaned_data')
+    def save_cleaned_data(self, output_filepath, batch_size=1000):
+        """Save the cleaned data to CSV, then bulk-write the valid movies and their directors.
+
+        Rows are validated against the Movie and Director schemas column by column,
+        valid ones are written with one bulk upsert per batch and invalid ones are
+        returned in the report (and kept in self.invalid_rows) instead of raising.
+        """
         cleaned_df = self.clean_data()
         cleaned_df.to_csv(output_filepath, index=False)
         print(f"Cleaned data saved to {output_filepath}")
 
-        # Insert movies and directors into MongoDB
-        for index, row in cleaned_df.iterrows():
-            # Prepare movie data
-            movie = Movie(
-                title=row['Title'],
-                year=row['Year'],
-                summary=row['Summary'],
-                short_summary=row['Short Summary'],
-                imdb_id=row['IMDB ID'],
-                runtime=row['Runtime'],
-                youtube_trailer=row['YouTube Trailer'],
-                rating=row['Rating'],
-                movie_poster=row['Movie Poster'],
-                directors=row['Directors'],
-                writers=row['Writers'],
-                cast=row['Cast']
-            )
+        # Validate movies over whole columns
+        movies = self.to_movie_documents(cleaned_df)
+        valid, errors = validate_frame(movies, Movie)
+        self.invalid_rows = cleaned_df.loc[errors.index].assign(errors=errors)
+        if len(self.invalid_rows):
+            print(f"{len(self.invalid_rows)} movies failed validation and were not inserted.")
+        metrics.incr('rows_rejected', len(self.invalid_rows))
+
+        # Insert movies in batches
+        movie_summary = self._bulk_save(Movie, movies[valid], 'imdb_id', batch_size)
+
+        # Insert the directors of the valid movies, deduplicated in memory first
+        directors = pd.DataFrame({'name': sorted(distinct_people(movies.loc[valid, 'directors']))})
+        valid_directors, director_errors = validate_frame(directors, Director)
+        if len(director_errors):
+            print(f"{len(director_errors)} directors failed validation and were not inserted.")
+        director_summary = self._bulk_save(Director, directors[valid_directors], 'name', batch_size)
+
+        print(f"Movies: {movie_summary['inserted']} inserted, {movie_summary['skipped']} skipped. "
+              f"Directors: {director_summary['inserted']} inserted, {director_summary['skipped']} skipped.")
+        return {'movies': movie_summary, 'directors': director_summary, 'invalid_rows': self.invalid_rows}
 
-            # Insert the movie, catching validation errors
-            try:
-                movie.save()
-                print(f"Inserted movie: {movie.title}")
-            except ValidationError as e:
-                print(f"Error inserting movie {movie.title}: {e}")
+    @staticmethod
+    def to_movie_documents(cleaned_df) -> pd.DataFrame:
+        """Rename the cleaned columns to the Movie schema fields."""
+        movies = pd.DataFrame({field: cleaned_df[column] for field, column in MOVIE_COLUMNS.items()
+                               if column in cleaned_df.columns})
+        if 'youtube_trailer' in movies.columns:
+            # The CSV holds YouTube video IDs, the schema expects the trailer URL
+            trailer = movies['youtube_trailer']
+            is_url = trailer.astype(str).str.contains('://', regex=False) | trailer.isna()
+            movies['youtube_trailer'] = trailer.where(is_url, YOUTUBE_TRAILER_URL + trailer.astype(str))
+        return movies
 
-            # Insert directors if they do not exist
-            for director_name in row['Directors']:
-                try:
-                    director = Director(name=director_name)
-                    director.save()  # Will only save if unique
-                    print(f"Inserted new director: {director.name}")
-                except ValidationError:
-                    print(f"Director {director_name} already exists or is invalid.")
+    @staticmethod
+    def _bulk_save(document_class, documents, unique_key, batch_size):
+        """Upsert documents into the collection of a schema, one bulk write per batch."""
+        collection = document_class._get_collection()
+        # Integer fields are stored as integers even if pandas parsed them as floats
+        documents = documents.astype({name: 'Int64' for name, field in document_class._fields.items()
+                                      if isinstance(field, IntField) and name in documents.columns})
+        # Missing optional values are stored as null rather than NaN
+        documents = documents.astype(object).where(documents.notna(), None)
+        summary = new_summary()
+        for batch in iter_batches(documents.to_dict(orient='records'), batch_size):
+            batch_summary, _ = upsert_batch(collection, batch, unique_key)
+            merge_summary(summary, batch_summary)
+        for outcome in ('inserted', 'updated', 'skipped'):
+            metrics.incr(f"rows_{outcome}", summary[outcome], collection=collection.name)
+        return summary
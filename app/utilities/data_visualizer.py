@@ -1,56 +1,113 @@
-import matplotlib.pyplot as plt
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
 import pandas as pd
-from pymongo import MongoClient
+
+from app.persistence.connection import get_client
+from app.persistence.data_processor import VIEW_PIPELINES, fetch_all_query, view_documents
+from app.persistence.loader import load_frame
+from app.utilities.analytics_engine import VIEW_COLUMNS
+from app.utilities.charts import CHARTS, chart_path, render_chart
+from app.utilities.instrumentation import timed
+
 
 class DataVisualizer:
-    def __init__(self, db_name):
-        self.client = MongoClient()  # Adjust connection parameters as needed
-        self.db = self.client[db_name]
+    def __init__(self, db_name=None, uri=None, engine=None, cache=None):
+        """Plot the views of db_name, or the offline results of an AnalyticsEngine when one is given."""
+        self.engine = engine
+        self.cache = cache  # Optional ResultCache for fetched views
+        if engine is None:
+            self.client = get_client(uri)  # Connection parameters are set through connection.configure()
+            self.db = self.client[db_name]
 
-    def fetch_data(self, view_name):
-        """Fetch data from the specified view."""
-        return pd.DataFrame(list(self.db[view_name].find()))
+    @timed('visualizer.fetch_data')
+    def fetch_data(self, view_name, projection=None):
+        """Fetch data from the specified view, optionally limited to the projected fields."""
+        if self.engine is not None:
+            data = self.engine.result(view_name)
+            if projection is not None:
+                data = data[['_id'] + [column for column in projection if column != '_id']]
+            return data
+        if self.cache is None:
+            return load_frame(self.db[view_name], projection)
+        return self.cache.get_or_load(self.db, view_name, lambda: load_frame(self.db[view_name], projection),
+                                      projection=projection, derived=True)
 
-    def plot_top_5_directors_most_films(self):
-        data = self.fetch_data('top_5_directors_most_films')
-        plt.figure(figsize=(10, 8))
-        plt.pie(data['film_count'], labels=data['_id'], autopct='%1.1f%%', startangle=140)
-        plt.title('Top 5 Directors by Number of Films')
-        plt.axis('equal')  # Equal aspect ratio ensures that pie is drawn as a circle.
+    @timed('visualizer.fetch_all')
+    def fetch_all(self):
+        """Fetch the data of every view in a single round trip, keyed by view name.
+
+        Against MongoDB the views are read in one aggregation: indexed reads of the
+        director_stats and actor_stats accumulators chained with $unionWith when
+        they exist (see fetch_all_query), else the four view pipelines as a $facet
+        over movies.
+        """
+        if self.engine is not None:
+            return self.engine.results()
+
+        def loader():
+            source, pipeline = fetch_all_query(self.db.list_collection_names())
+            documents = view_documents(self.db[source].aggregate(pipeline))
+            return {view: pd.DataFrame(documents.get(view, []), columns=VIEW_COLUMNS[view]) for view in VIEW_PIPELINES}
+
+        if self.cache is None:
+            return loader()
+        return self.cache.get_or_load(self.db, '$facet', loader, derived=True)
+
+    @timed('visualizer.render_all')
+    def render_all(self, output_dir, formats=('png',), workers=None, prefix=''):
+        """Render every chart to image files with a non-interactive backend.
+
+        The data comes from one fetch_all() round trip and the charts are drawn in
+        parallel worker processes. Returns the paths of the written files.
+        """
+        return render_charts([(prefix, self.fetch_all())], output_dir, formats, workers)
+
+    def _show(self, chart):
+        """Draw a chart and show it interactively."""
+        import matplotlib.pyplot as plt  # Only interactive plots need pyplot in this process
+
+        view, fields, draw = CHARTS[chart]
+        data = self.fetch_data(view, fields)
+        draw(plt, data)
         plt.show()
 
+    @timed('visualizer.plot_top_5_directors_most_films')
+    def plot_top_5_directors_most_films(self):
+        self._show('top_5_directors_most_films')
+
+    @timed('visualizer.plot_top_5_directors_rated')
     def plot_top_5_directors_rated(self):
-        data = self.fetch_data('top_5_directors_rated')
-        plt.figure(figsize=(10, 6))
-        plt.barh(data['_id'], data['average_rating'], color='salmon')
-        plt.title('Top 5 Directors by Average Rating')
-        plt.xlabel('Average Rating')
-        plt.ylabel('Directors')
-        plt.grid(axis='x', linestyle='--', alpha=0.7)
-        plt.tight_layout()
-        plt.show()
+        self._show('top_5_directors_rated')
 
+    @timed('visualizer.plot_director_average_runtime')
     def plot_director_average_runtime(self):
-        data = self.fetch_data('top_5_directors_longest_avg_runtime')  # Adjust as needed
-        plt.figure(figsize=(10, 6))
-        plt.barh(data['_id'], data['average_runtime'], color='skyblue')
-        plt.title('Average Runtime by Director')
-        plt.xlabel('Average Runtime (minutes)')
-        plt.ylabel('Directors')
-        plt.grid(axis='x', linestyle='--', alpha=0.7)
-        plt.tight_layout()
-        plt.show()
+        self._show('director_average_runtime')
+
+    @timed('visualizer.plot_top_15_actors_with_movies')
     def plot_top_15_actors_with_movies(self):
-        data = self.fetch_data('top_15_actors_with_movies')
-        plt.figure(figsize=(10, 6))
-        plt.scatter(data['_id'], data['film_count'], color='lightcoral', s=100)
-        plt.title('Top 15 Actors by Number of Movies')
-        plt.xlabel('Actors')
-        plt.ylabel('Number of Movies')
-        plt.xticks(rotation=45)
-        plt.grid(True)
-        plt.tight_layout()
-        plt.show()
+        self._show('top_15_actors_with_movies')
+
+
+def render_charts(datasets, output_dir, formats=('png',), workers=None):
+    """Render every chart of each (file prefix, view results) pair in one process pool."""
+    os.makedirs(output_dir, exist_ok=True)
+    tasks = [(chart, results[view], chart_path(output_dir, chart, image_format, prefix))
+             for prefix, results in datasets
+             for chart, (view, _, _) in CHARTS.items()
+             for image_format in formats]
+    # Workers are spawned so they start without the parent's pyplot state
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context) as executor:
+        return list(executor.map(render_chart, tasks))
+
+
+def render_databases(db_names, output_dir, formats=('png',), workers=None, uri=None):
+    """Produce the chart bundle of several databases, files prefixed with the database name."""
+    datasets = [(f"{db_name}_", DataVisualizer(db_name, uri).fetch_all()) for db_name in db_names]
+    return render_charts(datasets, output_dir, formats, workers)
+
 
 # Example usage
 if __name__ == "__main__":
@@ -0,0 +1,164 @@
+import json
+import os
+import threading
+import time
+from functools import wraps
+
+# Setting this to a file path enables instrumentation; a .prom path selects the Prometheus textfile format
+OUTPUT_ENV = 'FILMS_METRICS_OUTPUT'
+
+
+class _NullSpan:
+    """Span used while instrumentation is disabled, it does nothing."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    def __init__(self, metrics, name):
+        self.metrics = metrics
+        self.name = name
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.metrics.observe(self.name, time.perf_counter() - self.started)
+        return False
+
+
+class Metrics:
+    """Process-wide stage timings and counters.
+
+    When disabled, span() returns a shared no-op context manager and incr()
+    returns immediately, so instrumented code pays only an attribute check.
+    """
+
+    def __init__(self):
+        self.output = os.environ.get(OUTPUT_ENV)
+        self.enabled = bool(self.output)
+        self._lock = threading.Lock()
+        self.spans = {}
+        self.counters = {}
+
+    def enable(self, output=None):
+        """Turn instrumentation on; enable it before creating clients to count MongoDB round trips."""
+        self.enabled = True
+        self.output = output or self.output
+
+    def disable(self):
+        self.enabled = False
+
+    def reset(self):
+        with self._lock:
+            self.spans.clear()
+            self.counters.clear()
+
+    def span(self, name):
+        """Return a context manager timing a pipeline stage."""
+        if not self.enabled:
+            return _NULL_SPAN
+        return _Span(self, name)
+
+    def observe(self, name, seconds):
+        with self._lock:
+            stats = self.spans.setdefault(name, {'count': 0, 'total_seconds': 0.0, 'max_seconds': 0.0})
+            stats['count'] += 1
+            stats['total_seconds'] += seconds
+            stats['max_seconds'] = max(stats['max_seconds'], seconds)
+
+    def incr(self, name, value=1, **labels):
+        """Add value to a counter, optionally split by labels (e.g. collection='movies')."""
+        if not self.enabled:
+            return
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def snapshot(self) -> dict:
+        """Return the recorded spans and counters as plain data."""
+        with self._lock:
+            return {
+                'spans': {name: dict(stats) for name, stats in self.spans.items()},
+                'counters': [{'name': name, 'labels': dict(labels), 'value': value}
+                             for (name, labels), value in self.counters.items()],
+            }
+
+    def write_json(self, path):
+        _write_atomically(path, json.dumps(self.snapshot(), indent=2))
+
+    def write_prometheus(self, path):
+        """Write the metrics in the Prometheus node exporter textfile format."""
+        snapshot = self.snapshot()
+        lines = []
+        for field, kind in (('count', 'counter'), ('total_seconds', 'counter'), ('max_seconds', 'gauge')):
+            metric = f"films_stage_{field}"
+            lines.append(f"# TYPE {metric} {kind}")
+            for name, stats in sorted(snapshot['spans'].items()):
+                lines.append(f'{metric}{{stage="{name}"}} {stats[field]}')
+        for name in sorted({counter['name'] for counter in snapshot['counters']}):
+            lines.append(f"# TYPE films_{name}_total counter")
+            for counter in snapshot['counters']:
+                if counter['name'] == name:
+                    labels = ','.join(f'{key}="{value}"' for key, value in counter['labels'].items())
+                    labels = f"{{{labels}}}" if labels else ''
+                    lines.append(f"films_{name}_total{labels} {counter['value']}")
+        _write_atomically(path, '\n'.join(lines) + '\n')
+
+    def flush(self, path=None):
+        """Write the metrics to path (or the configured output) if instrumentation is enabled."""
+        path = path or self.output
+        if not (self.enabled and path):
+            return
+        if path.endswith('.prom'):
+            self.write_prometheus(path)
+        else:
+            self.write_json(path)
+
+
+metrics = Metrics()
+
+
+def timed(name):
+    """Decorate a function so each call is recorded as a span named name."""
+    def decorator(function):
+        @wraps(function)
+        def wrapper(*args, **kwargs):
+            if not metrics.enabled:
+                return function(*args, **kwargs)
+            with metrics.span(name):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def command_listener():
+    """Return a pymongo CommandListener counting MongoDB round trips per command."""
+    from pymongo import monitoring
+
+    class RoundTripCounter(monitoring.CommandListener):
+        def started(self, event):
+            metrics.incr('mongodb_round_trips', command=event.command_name)
+
+        def succeeded(self, event):
+            pass
+
+        def failed(self, event):
+            metrics.incr('mongodb_failed_commands', command=event.command_name)
+
+    return RoundTripCounter()
+
+
+def _write_atomically(path, content):
+    temporary_path = f"{path}.{os.getpid()}.tmp"
+    with open(temporary_path, 'w', encoding='utf-8') as file:
+        file.write(content)
+    os.replace(temporary_path, path)
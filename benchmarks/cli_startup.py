@@ -0,0 +1,52 @@
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import time
+
+from app.cli import SUBCOMMAND_MODULES
+
+# Arguments a subcommand needs to get past argument parsing
+REQUIRED_ARGS = {
+    'export': ['--output', 'export.csv'],
+    'search': ['startup'],
+    'snapshot': ['snapshot'],
+    'restore': ['snapshot'],
+}
+
+
+def measure(command, repeat):
+    """Return the wall-clock seconds of repeated `app.cli --imports-only <command>` runs."""
+    durations = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        subprocess.run([sys.executable, '-m', 'app.cli', '--imports-only', command] + REQUIRED_ARGS.get(command, []),
+                       check=True, stdout=subprocess.DEVNULL)
+        durations.append(time.perf_counter() - started)
+    return durations
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure the startup time of every CLI subcommand")
+    parser.add_argument('--commands', nargs='+', choices=list(SUBCOMMAND_MODULES), default=list(SUBCOMMAND_MODULES))
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--output', default='cli_startup.json')
+    args = parser.parse_args(argv)
+
+    results = []
+    for command in args.commands:
+        durations = measure(command, args.repeat)
+        result = {'command': command, 'median_seconds': statistics.median(durations), 'max_seconds': max(durations)}
+        results.append(result)
+        print(f"{command:<10} median {result['median_seconds']:.3f}s  max {result['max_seconds']:.3f}s",
+              file=sys.stderr)
+
+    with open(args.output, 'w', encoding='utf-8') as file:
+        json.dump({'python': sys.version.split()[0], 'repeat': args.repeat, 'results': results}, file, indent=2)
+    print(f"Results written to {args.output}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,205 @@
+import argparse
+import json
+import os
+import platform
+import resource
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone
+
+import pandas as pd
+
+from app.persistence import connection
+from app.persistence.data_processor import DataProcessor, VIEW_NAMES
+from app.persistence.data_quality import DataQualityChecker
+from app.persistence.database import Database
+from benchmarks.synthetic_catalog import write_catalog
+
+DB_NAME = 'movies_benchmark'
+STAGES = ['setup_database', 'clean_data', 'load_data', 'create_views', 'save_cleaned_data']
+
+
+class PeakRSSSampler:
+    """Sample the resident set size in a background thread and keep the peak."""
+
+    def __init__(self, interval=0.005):
+        self.interval = interval
+        self.peak = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def __enter__(self):
+        self.peak = current_rss()
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, current_rss())
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.peak = max(self.peak, current_rss())
+
+
+def current_rss():
+    """Return the resident set size in bytes, or the lifetime peak where /proc isn't available."""
+    try:
+        with open('/proc/self/statm') as statm:
+            return int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except OSError:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def connect(backend, uri):
+    """Point the shared client registry at a local mongod or an in-process mongomock stand-in."""
+    if backend == 'mongomock':
+        from benchmarks.standin import StandInClient
+        connection.register_client(StandInClient(), uri)
+    elif uri:
+        connection.configure(uri=uri)
+
+
+def reset_database():
+    connection.get_client().drop_database(DB_NAME)
+
+
+def stage_setup_database(csv_file, workdir):
+    reset_database()
+    yield
+    Database(DB_NAME).setup_database_from_csv(csv_file, collection_name='movies', unique_key='IMDB ID')
+
+
+def stage_clean_data(csv_file, workdir):
+    data = pd.read_csv(csv_file)
+    yield
+    DataQualityChecker(data).clean_data()
+
+
+def stage_load_data(csv_file, workdir):
+    yield
+    Database(DB_NAME).load_data('movies')
+
+
+def stage_create_views(csv_file, workdir):
+    processor = DataProcessor(DB_NAME)
+    yield
+    processor.create_views()
+    for view in VIEW_NAMES:
+        processor.load_data(view)
+
+
+def stage_save_cleaned_data(csv_file, workdir):
+    from app.utilities.data_cleaner import MovieDataCleaner
+
+    cleaner = MovieDataCleaner(csv_file, None, DB_NAME)
+    yield
+    cleaner.save_cleaned_data(os.path.join(workdir, 'cleaned.csv'))
+
+
+def run_stage(stage, csv_file, workdir, rows):
+    """Run one stage: its setup is untimed, the part after its `yield` is measured."""
+    steps = globals()[f"stage_{stage}"](csv_file, workdir)
+    result = {'stage': stage, 'rows': rows}
+    try:
+        next(steps)
+        with PeakRSSSampler() as sampler:
+            started = time.perf_counter()
+            next(steps, None)
+            seconds = time.perf_counter() - started
+        result.update(seconds=seconds, rows_per_second=rows / seconds if seconds else 0.0,
+                      peak_rss_bytes=sampler.peak)
+    except Exception as e:
+        # Keep measuring the other stages; main() still fails the run
+        result['error'] = f"{type(e).__name__}: {e}"
+    return result
+
+
+def run(scales, stages, backend, uri):
+    connect(backend, uri)
+    results = []
+    with tempfile.TemporaryDirectory() as workdir:
+        for scale in scales:
+            csv_file = os.path.join(workdir, f"movies_{scale}x.csv")
+            rows = write_catalog(csv_file, scale)
+            for stage in stages:
+                result = run_stage(stage, csv_file, workdir, rows)
+                result['scale'] = scale
+                results.append(result)
+                print(format_result(result), file=sys.stderr)
+        reset_database()
+    return {
+        'meta': {
+            'created_at': datetime.now(timezone.utc).isoformat(),
+            'backend': backend,
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+        },
+        'results': results,
+    }
+
+
+def format_result(result):
+    prefix = f"[{result['scale']}x] {result['stage']}"
+    if 'error' in result:
+        return f"{prefix}: failed ({result['error']})"
+    return (f"{prefix}: {result['seconds']:.3f}s, {result['rows_per_second']:.0f} rows/s, "
+            f"peak RSS {result['peak_rss_bytes'] / 2 ** 20:.1f} MiB")
+
+
+def compare(current, baseline, threshold):
+    """Return the stages whose wall time grew by more than threshold (a ratio) against the baseline.
+
+    A stage that ran in the baseline but failed now is reported with a ratio of None.
+    """
+    previous = {(r['scale'], r['stage']): r for r in baseline['results'] if 'error' not in r}
+    regressions = []
+    for result in current['results']:
+        before = previous.get((result['scale'], result['stage']))
+        if before is None:
+            continue
+        if 'error' in result:
+            regressions.append({'scale': result['scale'], 'stage': result['stage'], 'ratio': None})
+            continue
+        if not before['seconds']:
+            continue
+        ratio = result['seconds'] / before['seconds']
+        if ratio > threshold:
+            regressions.append({'scale': result['scale'], 'stage': result['stage'], 'ratio': ratio})
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the ingestion, cleaning, loading and view pipeline")
+    parser.add_argument('--scales', type=float, nargs='+', default=[1, 10, 100])
+    parser.add_argument('--stages', nargs='+', choices=STAGES, default=STAGES)
+    parser.add_argument('--backend', choices=['mongod', 'mongomock'], default='mongod')
+    parser.add_argument('--uri', default=None, help="MongoDB URI of the local mongod")
+    parser.add_argument('--output', default='benchmark_results.json')
+    parser.add_argument('--compare', default=None, help="Earlier results file to check for regressions")
+    parser.add_argument('--threshold', type=float, default=1.2,
+                        help="Slowdown ratio against --compare reported as a regression")
+    args = parser.parse_args(argv)
+
+    report = run(args.scales, args.stages, args.backend, args.uri)
+    with open(args.output, 'w', encoding='utf-8') as file:
+        json.dump(report, file, indent=2)
+    print(f"Results written to {args.output}", file=sys.stderr)
+    failed = [result for result in report['results'] if 'error' in result]
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as file:
+            regressions = compare(report, json.load(file), args.threshold)
+        for regression in regressions:
+            change = "failed" if regression['ratio'] is None else f"{regression['ratio']:.2f}x slower"
+            print(f"Regression [{regression['scale']}x] {regression['stage']}: {change}", file=sys.stderr)
+        return 1 if regressions or failed else 0
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
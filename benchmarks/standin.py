@@ -0,0 +1,167 @@
+"""In-process MongoDB stand-in built on mongomock, for the benchmarks and tests.
+
+mongomock covers CRUD and most aggregation stages but not everything the
+pipeline relies on. StandInClient fills the gaps:
+
+- find_raw_batches returns BSON-encoded batches, like the server's raw cursors;
+- views created with db.command('create', name, viewOn=..., pipeline=...) are
+  re-evaluated over their source whenever they are read, and the 'drop'
+  command removes them;
+- aggregations run $unionWith stages and the $trim expression;
+- undecoded RawBSONDocuments can be inserted, as snapshot restores do;
+- bulk updates and replacements accept the sort option newer pymongo releases
+  always pass along.
+"""
+import bson
+import mongomock
+from bson.raw_bson import RawBSONDocument
+from mongomock.aggregate import _Parser, process_pipeline
+from mongomock.collection import BulkOperationBuilder
+from mongomock.command_cursor import CommandCursor
+from mongomock.database import Database
+from mongomock.results import BulkWriteResult
+
+DEFAULT_RAW_BATCH_SIZE = 101
+
+_handle_string_operator = _Parser._handle_string_operator
+
+
+def _handle_trim(parser, operator, values):
+    """Evaluate $trim, which mongomock lists as a string operator but doesn't implement."""
+    if operator != '$trim':
+        return _handle_string_operator(parser, operator, values)
+    value = parser.parse(values['input'])
+    chars = parser.parse(values['chars']) if 'chars' in values else None
+    return value.strip(chars) if isinstance(value, str) else None
+
+
+# mongomock evaluates every expression through _Parser, so $trim has to be added there
+_Parser._handle_string_operator = _handle_trim
+
+
+class StandInBulkBuilder(BulkOperationBuilder):
+    """Bulk builder that accepts the sort option of pymongo 4.11+ update and replace requests."""
+
+    def add_update(self, selector, doc, multi=False, upsert=False, sort=None, **kwargs):
+        if sort is not None:
+            raise NotImplementedError('sort in bulk updates is not supported by the stand-in')
+        return super().add_update(selector, doc, multi, upsert, **kwargs)
+
+    def add_replace(self, selector, doc, upsert, sort=None, **kwargs):
+        if sort is not None:
+            raise NotImplementedError('sort in bulk replacements is not supported by the stand-in')
+        return super().add_replace(selector, doc, upsert, **kwargs)
+
+
+class StandInCollection(mongomock.Collection):
+
+    def find(self, filter=None, projection=None, *args, **kwargs):
+        self.database.refresh_view(self.name)
+        return super().find(filter, projection, *args, **kwargs)
+
+    def aggregate(self, pipeline, session=None, **kwargs):
+        self.database.refresh_view(self.name)
+        if not any('$unionWith' in stage for stage in pipeline):
+            return super().aggregate(pipeline, session=session, **kwargs)
+        # Run the stages between $unionWith ones with mongomock, appending the other collection at each
+        documents = list(self.find())
+        segment = []
+        for stage in list(pipeline) + [None]:
+            if stage is not None and '$unionWith' not in stage:
+                segment.append(stage)
+                continue
+            documents = list(process_pipeline(documents, self.database, segment, session))
+            segment = []
+            if stage is not None:
+                union = stage['$unionWith']
+                union = {'coll': union} if isinstance(union, str) else union
+                documents.extend(self.database[union['coll']].aggregate(union.get('pipeline', [])))
+        return CommandCursor(documents)
+
+    def insert_many(self, documents, *args, **kwargs):
+        documents = [bson.decode(document.raw) if isinstance(document, RawBSONDocument) else document
+                     for document in documents]
+        return super().insert_many(documents, *args, **kwargs)
+
+    def find_raw_batches(self, filter=None, projection=None, batch_size=0, **kwargs):
+        """Yield the matching documents as concatenated BSON, batch_size documents per batch."""
+        batch_size = batch_size or DEFAULT_RAW_BATCH_SIZE
+        batch = []
+        for document in self.find(filter, projection, **kwargs):
+            batch.append(bson.encode(document))
+            if len(batch) == batch_size:
+                yield b''.join(batch)
+                batch = []
+        if batch:
+            yield b''.join(batch)
+
+    def bulk_write(self, requests, ordered=True, bypass_document_validation=False, session=None):
+        if bypass_document_validation or session:
+            return super().bulk_write(requests, ordered, bypass_document_validation, session)
+        bulk = StandInBulkBuilder(self, ordered=ordered)
+        for operation in requests:
+            operation._add_to_bulk(bulk)
+        return BulkWriteResult(bulk.execute(), True)
+
+    def with_options(self, *args, **kwargs):
+        collection = super().with_options(*args, **kwargs)
+        collection.__class__ = type(self)
+        return collection
+
+
+class StandInDatabase(Database):
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._views = {}
+
+    def get_collection(self, name, *args, **kwargs):
+        if name not in self._collection_accesses:
+            self._ensure_valid_collection_name(name)
+            self._collection_accesses[name] = StandInCollection(
+                self, name=name, read_preference=self.read_preference, codec_options=self._codec_options,
+                _db_store=self._store)
+        return super().get_collection(name, *args, **kwargs)
+
+    def command(self, command, value=None, **kwargs):
+        """Run 'create' (of views) and 'drop' like the server; other commands go to mongomock."""
+        if command == 'create' and 'viewOn' in kwargs:
+            if value in self.list_collection_names():
+                raise mongomock.OperationFailure(f"Collection {self.name}.{value} already exists.", code=48)
+            self._views[value] = (kwargs['viewOn'], list(kwargs.get('pipeline', [])))
+            self.refresh_view(value)
+            return {'ok': 1.0}
+        if command == 'drop':
+            if value not in self.list_collection_names():
+                raise mongomock.OperationFailure('ns not found', code=26)
+            self.drop_collection(value)
+            return {'ok': 1.0}
+        return super().command(command, **kwargs)
+
+    def drop_collection(self, name_or_collection, session=None):
+        name = getattr(name_or_collection, 'name', name_or_collection)
+        self._views.pop(name, None)
+        return super().drop_collection(name_or_collection, session)
+
+    def refresh_view(self, name):
+        """Recompute the documents of a view from its source; other collections are left alone."""
+        if name not in self._views:
+            return
+        source, pipeline = self._views[name]
+        documents = list(self[source].aggregate(pipeline)) if source in self.list_collection_names() else []
+        store = self._store[name]
+        store.drop()
+        store.create()
+        for position, document in enumerate(documents):
+            store[document.get('_id', position)] = document
+
+
+class StandInClient(mongomock.MongoClient):
+    """mongomock client whose databases understand views, raw batches and newer bulk requests."""
+
+    def get_database(self, name=None, *args, **kwargs):
+        if name is not None and name not in self._database_accesses:
+            self._database_accesses[name] = StandInDatabase(
+                self, name, _store=self._store[name], read_preference=self.read_preference,
+                codec_options=self._codec_options)
+        return super().get_database(name, *args, **kwargs)
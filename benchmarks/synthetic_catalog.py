@@ -0,0 +1,103 @@
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+# Number of rows in data/movies.csv, the 1x scale
+BASE_ROWS = 3886
+
+COLUMNS = ['Title', 'Year', 'Summary', 'Short Summary', 'IMDB ID', 'Runtime', 'YouTube Trailer', 'Rating',
+           'Movie Poster', 'Director', 'Writers', 'Cast']
+
+# Shape of data/movies.csv: people per movie, share of invalid runtimes, year range, ...
+CAST_SIZES = ([1, 2, 3], [0.04, 0.37, 0.59])
+WRITER_SIZES = ([1, 2], [0.99, 0.01])
+DIRECTORS_PER_MOVIE = 0.6
+ACTORS_PER_MOVIE = 1.2
+WRITERS_PER_MOVIE = 0.75
+ZERO_RUNTIME_SHARE = 0.05
+YEARS = (2000, 2018)
+
+FIRST_NAMES = ['James', 'Mary', 'Robert', 'Patricia', 'John', 'Jennifer', 'Michael', 'Linda', 'David', 'Elizabeth',
+               'William', 'Barbara', 'Richard', 'Susan', 'Joseph', 'Jessica', 'Thomas', 'Sarah', 'Charles', 'Karen',
+               'Nicolas', 'Ryan', 'Mark', 'Matt', 'Clint', 'Ridley', 'Steven', 'Woody', 'Greg', 'Sylvain']
+LAST_NAMES = ['Smith', 'Johnson', 'Williams', 'Brown', 'Jones', 'Garcia', 'Miller', 'Davis', 'Rodriguez', 'Martinez',
+              'Hernandez', 'Lopez', 'Gonzalez', 'Wilson', 'Anderson', 'Thomas', 'Taylor', 'Moore', 'Jackson', 'Martin',
+              'Cage', 'Reynolds', 'Wahlberg', 'Damon', 'Eastwood', 'Scott', 'Spielberg', 'Allen', 'Whiteley', 'Kane']
+WORDS = ['a', 'the', 'young', 'man', 'woman', 'family', 'journey', 'war', 'love', 'city', 'secret', 'life', 'after',
+         'loss', 'friends', 'college', 'father', 'son', 'band', 'world', 'struggles', 'finds', 'must', 'save', 'home',
+         'team', 'years', 'new', 'dark', 'past', 'returns', 'to', 'of', 'and', 'with', 'his', 'her', 'their']
+
+
+def people_pool(size, rng, prefix=''):
+    """Return `size` distinct person names."""
+    first = rng.choice(FIRST_NAMES, size)
+    last = rng.choice(LAST_NAMES, size)
+    return np.array([f"{f} {prefix}{l}{i}" for i, (f, l) in enumerate(zip(first, last))], dtype=object)
+
+
+def zipf_picks(pool, count, rng, exponent=0.8):
+    """Pick `count` names from pool with a long-tailed popularity like real credits."""
+    weights = 1.0 / np.arange(1, len(pool) + 1) ** exponent
+    return pool[rng.choice(len(pool), count, p=weights / weights.sum())]
+
+
+def join_people(pool, sizes, rng):
+    """Return one pipe-delimited credit string per movie, with the given number of names each."""
+    names = zipf_picks(pool, int(sizes.sum()), rng)
+    ends = np.cumsum(sizes)
+    return ['|'.join(names[end - size:end]) for size, end in zip(sizes, ends)]
+
+
+def sentences(rng, count, length):
+    """Return `count` pseudo-random sentences of about `length` words."""
+    words = rng.choice(WORDS, (count, length))
+    return [' '.join(row).capitalize() + '.' for row in words]
+
+
+def generate_catalog(scale=1, seed=42) -> pd.DataFrame:
+    """Generate a synthetic catalog shaped like data/movies.csv with BASE_ROWS * scale movies."""
+    rng = np.random.default_rng(seed)
+    rows = int(BASE_ROWS * scale)
+
+    directors = people_pool(max(1, int(rows * DIRECTORS_PER_MOVIE)), rng, 'D')
+    actors = people_pool(max(1, int(rows * ACTORS_PER_MOVIE)), rng, 'A')
+    writers = people_pool(max(1, int(rows * WRITERS_PER_MOVIE)), rng, 'W')
+
+    runtime = rng.normal(100, 20, rows).clip(40, 240).astype(int)
+    runtime[rng.random(rows) < ZERO_RUNTIME_SHARE] = 0
+    titles = [f"{title[:-1]} {i}" for i, title in enumerate(sentences(rng, rows, 3))]
+    imdb_ids = rng.choice(10_000_000, rows, replace=False)
+
+    return pd.DataFrame({
+        'Title': titles,
+        'Year': rng.integers(YEARS[0], YEARS[1] + 1, rows),
+        'Summary': sentences(rng, rows, 90),
+        'Short Summary': sentences(rng, rows, 20),
+        'IMDB ID': [f"tt{value:07d}" for value in imdb_ids],
+        'Runtime': runtime,
+        'YouTube Trailer': [f"yt{value:09d}" for value in rng.integers(0, 10 ** 9, rows)],
+        'Rating': rng.normal(6.56, 1.0, rows).clip(1, 10).round(1),
+        'Movie Poster': [f"https://example.com/posters/{title.replace(' ', '-')}.jpg" for title in titles],
+        'Director': zipf_picks(directors, rows, rng),
+        'Writers': join_people(writers, rng.choice(WRITER_SIZES[0], rows, p=WRITER_SIZES[1]), rng),
+        'Cast': join_people(actors, rng.choice(CAST_SIZES[0], rows, p=CAST_SIZES[1]), rng),
+    }, columns=COLUMNS)
+
+
+def write_catalog(path, scale=1, seed=42):
+    """Write a synthetic catalog to a CSV file and return its number of rows."""
+    catalog = generate_catalog(scale, seed)
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    catalog.to_csv(path, index=False)
+    return len(catalog)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate a synthetic movies.csv")
+    parser.add_argument('output')
+    parser.add_argument('--scale', type=float, default=1)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+    print(f"Wrote {write_catalog(args.output, args.scale, args.seed)} movies to {args.output}")
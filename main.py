@@ -1,10 +1,17 @@
-from app.persistence.data_processor import DataProcessor
-from app.persistence.database import Database
-from app.utilities.data_visualizer import DataVisualizer
+import sys
 
 
 def main():
- 
+    """Run the whole pipeline: ingest, print, describe, then the four plots.
+
+    Single steps are subcommands of app.cli (python main.py views, python -m app.cli plot, ...),
+    which only import what the step needs.
+    """
+    from app.persistence.data_processor import DataProcessor
+    from app.persistence.database import Database
+    from app.utilities.data_visualizer import DataVisualizer
+    from app.utilities.instrumentation import metrics
+
     # Path to your CSV file
     csv_file = 'data/movies.csv'
 
@@ -12,12 +19,9 @@ def main():
     db_name = 'movies'  # You can change this as needed
     db = Database(db_name=db_name)
 
-    # Load data from the CSV file
-    movie_data = db.load_data_from_csv(csv_file)
-
-    # Setup the database and insert movie data into the 'movies' collection
+    # Stream the CSV file chunk by chunk into the 'movies' collection
     # The unique key here is 'IMDB ID'
-    db.setup_database(movie_data, collection_name='movies', unique_key='IMDB ID')
+    db.setup_database_from_csv(csv_file, collection_name='movies', unique_key='IMDB ID')
 
     # Optionally, you can verify by loading the data back into a pandas DataFrame
     data_df = db.load_data('movies')
@@ -42,8 +46,14 @@ def main():
     visualizer.plot_director_average_runtime()
     visualizer.plot_top_15_actors_with_movies()
 
+    # Write stage timings and counters when FILMS_METRICS_OUTPUT is set
+    metrics.flush()
+
 
 
 
 if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        from app.cli import main as cli_main
+        sys.exit(cli_main())
     main()
@@ -0,0 +1,76 @@
+import pytest
+
+from app.persistence import connection
+from app.persistence.aggregates import ACTOR_STATS, DIRECTOR_STATS, MaterializedAggregates
+from app.persistence.data_processor import DataProcessor
+from app.persistence.database import Database
+from benchmarks.standin import StandInClient
+
+URI = 'mongodb://test-aggregates'
+
+CLEO = {'IMDB ID': 'tt0055852', 'Title': 'Cléo', 'Director': ['Agnès Varda'],
+        'Cast': ['Corinne Marchand', 'Antoine Bourseiller'], 'Rating': 7.9, 'Runtime': 90}
+BONHEUR = {'IMDB ID': 'tt0059000', 'Title': 'Le Bonheur', 'Director': ['Agnès Varda'],
+           'Cast': ['Jean-Claude Drouot'], 'Rating': 7.1, 'Runtime': 80}
+
+
+@pytest.fixture
+def db():
+    return StandInClient()['films_test']
+
+
+def _stats(db, collection_name):
+    return {document['_id']: document for document in db[collection_name].find()}
+
+
+def test_inserted_movies_are_added_to_the_accumulators(db):
+    MaterializedAggregates(db).on_change('movies', [CLEO, BONHEUR], [])
+
+    director = _stats(db, DIRECTOR_STATS)['Agnès Varda']
+    assert (director['film_count'], director['average_rating'], director['average_runtime']) == (2, 7.5, 85.0)
+    assert _stats(db, ACTOR_STATS)['Corinne Marchand']['movies'] == ['Cléo']
+
+
+def test_updated_movies_replace_their_previous_version(db):
+    aggregates = MaterializedAggregates(db)
+    aggregates.on_change('movies', [CLEO, BONHEUR], [])
+
+    updated = dict(CLEO, Rating=8.1, Cast=['Corinne Marchand'])
+    aggregates.on_change('movies', [updated], [CLEO])
+
+    assert _stats(db, DIRECTOR_STATS)['Agnès Varda']['average_rating'] == pytest.approx(7.6)
+    actors = _stats(db, ACTOR_STATS)
+    assert actors['Corinne Marchand']['film_count'] == 1
+    assert actors['Corinne Marchand']['movies'] == ['Cléo']
+    # His only movie no longer credits him: film_count dropped to 0 and the document is gone
+    assert 'Antoine Bourseiller' not in actors
+
+
+def test_deleted_movies_are_removed_from_the_accumulators(db):
+    aggregates = MaterializedAggregates(db)
+    aggregates.on_change('movies', [CLEO, BONHEUR], [])
+
+    aggregates.on_change('movies', [], [BONHEUR])
+    assert _stats(db, DIRECTOR_STATS)['Agnès Varda']['film_count'] == 1
+    assert 'Jean-Claude Drouot' not in _stats(db, ACTOR_STATS)
+
+    aggregates.on_change('movies', [], [CLEO])
+    assert _stats(db, DIRECTOR_STATS) == {} and _stats(db, ACTOR_STATS) == {}
+
+
+def test_writes_keep_existing_accumulators_up_to_date_without_opting_in():
+    client = connection.register_client(StandInClient(), URI)
+    try:
+        Database('films_test', URI).insert_data([CLEO], 'movies', 'IMDB ID')
+        DataProcessor('films_test', URI).create_views(materialized=True)
+
+        # A plain Database, as used by ingest, main.py or a delta ingest
+        database = Database('films_test', URI)
+        database.insert_data([BONHEUR], 'movies', 'IMDB ID')
+        assert _stats(client['films_test'], DIRECTOR_STATS)['Agnès Varda']['film_count'] == 2
+
+        database.delete_data('movies', 'IMDB ID', [CLEO['IMDB ID']])
+        assert _stats(client['films_test'], DIRECTOR_STATS)['Agnès Varda']['film_count'] == 1
+        assert 'Corinne Marchand' not in _stats(client['films_test'], ACTOR_STATS)
+    finally:
+        connection.close_clients()
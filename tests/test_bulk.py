@@ -0,0 +1,103 @@
+import pytest
+from pymongo.errors import BulkWriteError
+
+from app.persistence.bulk import ensure_unique_index, iter_batches, upsert_batch
+from benchmarks.standin import StandInClient
+
+
+@pytest.fixture
+def collection():
+    collection = StandInClient().db.movies
+    ensure_unique_index(collection, 'IMDB ID')
+    return collection
+
+
+class RacingCollection:
+    """Collection whose bulk writes fail with the scripted duplicate-key results first."""
+
+    def __init__(self, failures):
+        self.failures = list(failures)
+        self.calls = []
+
+    def bulk_write(self, requests, ordered):
+        self.calls.append([request._filter['IMDB ID'] for request in requests])
+        if self.failures:
+            raise BulkWriteError(self.failures.pop(0))
+        return _Result({'nUpserted': len(requests), 'nMatched': 0, 'nModified': 0,
+                        'upserted': [{'index': index} for index in range(len(requests))]})
+
+
+class _Result:
+    def __init__(self, details):
+        self.bulk_api_result = details
+
+
+def _duplicate(index):
+    return {'index': index, 'code': 11000, 'errmsg': 'E11000 duplicate key'}
+
+
+def test_iter_batches_splits_any_iterable():
+    assert list(iter_batches(iter(range(5)), 2)) == [[0, 1], [2, 3], [4]]
+
+
+def test_upsert_batch_inserts_new_and_skips_existing(collection):
+    collection.insert_one({'IMDB ID': 'tt0000001', 'Title': 'Old'})
+    batch = [{'IMDB ID': 'tt0000001', 'Title': 'New'}, {'IMDB ID': 'tt0000002', 'Title': 'Other'},
+             {'Title': 'No key'}]
+
+    summary, inserted_positions = upsert_batch(collection, batch, 'IMDB ID')
+
+    # mongomock numbers 'upserted' entries by upsert rather than by request, so
+    # positions are checked against scripted results below instead
+    assert summary == {'inserted': 1, 'updated': 0, 'skipped': 2}
+    assert len(inserted_positions) == 1
+    assert collection.find_one({'IMDB ID': 'tt0000001'})['Title'] == 'Old'
+
+
+def test_upsert_batch_update_existing_counts_only_real_changes(collection):
+    collection.insert_many([{'IMDB ID': 'tt0000001', 'Title': 'Old'}, {'IMDB ID': 'tt0000002', 'Title': 'Same'}])
+    batch = [{'IMDB ID': 'tt0000001', 'Title': 'New'}, {'IMDB ID': 'tt0000002', 'Title': 'Same'}]
+
+    summary, inserted_positions = upsert_batch(collection, batch, 'IMDB ID', update_existing=True)
+
+    assert summary == {'inserted': 0, 'updated': 1, 'skipped': 1}
+    assert inserted_positions == []
+    assert collection.find_one({'IMDB ID': 'tt0000001'})['Title'] == 'New'
+
+
+def test_unordered_duplicates_are_skipped_without_retry():
+    racing = RacingCollection([{
+        'writeErrors': [_duplicate(1)], 'nUpserted': 2, 'nMatched': 0, 'nModified': 0,
+        'upserted': [{'index': 0}, {'index': 2}],
+    }])
+    batch = [{'IMDB ID': f'tt000000{i}'} for i in range(3)]
+
+    summary, inserted_positions = upsert_batch(racing, batch, 'IMDB ID', ordered=False)
+
+    assert summary == {'inserted': 2, 'updated': 0, 'skipped': 1}
+    assert inserted_positions == [0, 2]
+    assert len(racing.calls) == 1
+
+
+def test_ordered_duplicate_retries_the_rest_with_batch_positions():
+    # The write stops at request 1; request 0 went through, 2 and 3 are retried
+    racing = RacingCollection([{
+        'writeErrors': [_duplicate(1)], 'nUpserted': 1, 'nMatched': 0, 'nModified': 0,
+        'upserted': [{'index': 0}],
+    }])
+    batch = [{'IMDB ID': 'tt0000000'}, {'Title': 'No key'}, {'IMDB ID': 'tt0000002'},
+             {'IMDB ID': 'tt0000003'}, {'IMDB ID': 'tt0000004'}]
+
+    summary, inserted_positions = upsert_batch(racing, batch, 'IMDB ID', ordered=True)
+
+    assert racing.calls == [['tt0000000', 'tt0000002', 'tt0000003', 'tt0000004'], ['tt0000003', 'tt0000004']]
+    assert summary == {'inserted': 3, 'updated': 0, 'skipped': 2}
+    # Positions refer to the original batch, across the key-less row and the retry
+    assert inserted_positions == [0, 3, 4]
+
+
+def test_other_write_errors_are_raised():
+    racing = RacingCollection([{'writeErrors': [{'index': 0, 'code': 121, 'errmsg': 'validation'}]}])
+
+    with pytest.raises(BulkWriteError):
+        upsert_batch(racing, [{'IMDB ID': 'tt0000001'}], 'IMDB ID')
@@ -0,0 +1,84 @@
+import pytest
+
+from app.persistence import connection
+from app.persistence.cache import DiskBackend, ResultCache, bump_collection_version
+from app.persistence.data_processor import DataProcessor
+from app.persistence.database import Database
+from benchmarks.standin import StandInClient
+
+URI = 'mongodb://test-cache'
+
+
+@pytest.fixture
+def client():
+    client = connection.register_client(StandInClient(), URI)
+    client['films_test']['directors'].insert_many([{'name': 'Agnès Varda'}, {'name': 'Chantal Akerman'}])
+    yield client
+    connection.close_clients()
+
+
+@pytest.fixture
+def processor(client):
+    return DataProcessor('films_test', URI, cache=ResultCache())
+
+
+def test_collection_entries_follow_their_own_version(processor):
+    assert len(processor.load_data('directors')) == 2
+
+    Database('films_test', URI).insert_data([{'name': 'Claire Denis'}], 'directors', 'name')
+
+    assert len(processor.load_data('directors')) == 3
+    assert processor.cache.stats()['misses'] == 2
+
+
+def test_views_follow_the_source_version(processor, client):
+    client['films_test']['top_5_directors_rated'].insert_one({'_id': 'Agnès Varda', 'average_rating': 8.0})
+    processor.load_data('top_5_directors_rated')
+
+    bump_collection_version(client['films_test'], 'directors')
+    processor.load_data('top_5_directors_rated')
+    assert processor.cache.stats()['hits'] == 1
+
+    bump_collection_version(client['films_test'], 'movies')
+    processor.load_data('top_5_directors_rated')
+    assert processor.cache.stats()['misses'] == 2
+
+
+def test_dtypes_are_part_of_the_key(processor):
+    processor.load_data('directors')
+
+    frame = processor.load_data('directors', dtypes={'name': 'category'})
+
+    assert frame['name'].dtype == 'category'
+
+
+def test_callers_get_copies(processor):
+    processor.load_data('directors').drop(index=0, inplace=True)
+
+    assert len(processor.load_data('directors')) == 2
+
+
+def test_disk_backend_reuses_results_across_caches(client, tmp_path):
+    first = DataProcessor('films_test', URI, cache=ResultCache(backend=DiskBackend(str(tmp_path))))
+    second = DataProcessor('films_test', URI, cache=ResultCache(backend=DiskBackend(str(tmp_path))))
+
+    first.load_data('directors')
+    second.load_data('directors')
+
+    assert second.cache.stats()['hits'] == 1
+
+
+def test_normalized_people_fields_invalidate_cached_movies(processor, client):
+    client['films_test']['movies'].insert_many([
+        {'Title': 'Cléo', 'Director': ' Agnès Varda ', 'Cast': 'Corinne Marchand|| Antoine Bourseiller '},
+        {'Title': 'Jeanne Dielman', 'Director': ['Chantal Akerman'], 'Cast': ['Delphine Seyrig']},
+    ])
+    processor.load_data('movies')
+
+    assert Database('films_test', URI).normalize_people_fields() == 2
+
+    movies = processor.load_data('movies').set_index('Title')
+    assert movies.loc['Cléo', 'Director'] == ['Agnès Varda']
+    assert movies.loc['Cléo', 'Cast'] == ['Corinne Marchand', 'Antoine Bourseiller']
+    assert movies.loc['Jeanne Dielman', 'Cast'] == ['Delphine Seyrig']
+    assert processor.cache.stats()['misses'] == 2
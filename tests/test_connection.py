@@ -0,0 +1,60 @@
+import mongomock
+import pytest
+from mongoengine import connection as mongoengine_connection
+
+from app.persistence import connection
+from app.schemas.director import Director
+
+URI = 'mongodb://test-connection'
+
+
+@pytest.fixture
+def client():
+    client = connection.register_client(mongomock.MongoClient(), URI)
+    yield client
+    connection.close_clients()
+    mongoengine_connection.disconnect_all()
+
+
+def test_get_client_returns_the_registered_client(client):
+    assert connection.get_client(URI) is client
+
+
+def test_connect_mongoengine_uses_the_shared_client(client):
+    connection.connect_mongoengine('films_test', URI)
+
+    assert mongoengine_connection.get_connection() is client
+    Director(name='Agnès Varda').save()
+    assert client['films_test']['director'].count_documents({'name': 'Agnès Varda'}) == 1
+
+
+def test_connect_mongoengine_rebinds_an_alias(client):
+    connection.connect_mongoengine('films_first', URI)
+    connection.connect_mongoengine('films_second', URI)
+
+    assert mongoengine_connection.get_db().name == 'films_second'
+    assert mongoengine_connection.get_connection() is client
+
+
+def test_configure_leaves_clients_in_use_open(client):
+    database = client['films_test']
+
+    with pytest.raises(RuntimeError):
+        connection.configure(max_pool_size=10)
+    with pytest.raises(RuntimeError):
+        connection.apply_settings(connection.settings())
+
+    assert connection.get_client(URI) is client
+    database['directors'].insert_one({'name': 'Agnès Varda'})
+    assert database['directors'].count_documents({}) == 1
+
+
+def test_configure_applies_to_clients_created_afterwards():
+    previous = connection.settings()
+    try:
+        connection.configure(max_pool_size=10, write_concern={'w': 1})
+
+        assert connection.settings()['maxPoolSize'] == 10
+        assert connection.settings()['write_concern'] == {'w': 1}
+    finally:
+        connection.apply_settings(previous)
@@ -0,0 +1,116 @@
+import pandas as pd
+import pytest
+from pymongo.errors import OperationFailure
+
+from app.persistence import connection
+from app.persistence.cache import ResultCache
+from app.persistence.data_processor import (DESCRIBE_STATS, QUANTILES, DataProcessor, sampled_quartiles,
+                                            statistics_frame, statistics_group)
+from app.persistence.database import Database
+from app.persistence.search import TEXT_INDEX_NAME
+from benchmarks.standin import StandInClient
+
+URI = 'mongodb://test-data-processor'
+
+
+@pytest.fixture
+def processor(tmp_path):
+    connection.register_client(StandInClient(), URI)
+    csv_file = str(tmp_path / 'movies.csv')
+    pd.read_csv('data/movies.csv', nrows=60).to_csv(csv_file, index=False)
+    Database('films_test', URI).setup_database_from_csv(csv_file, collection_name='movies', unique_key='IMDB ID')
+    processor = DataProcessor('films_test', URI, cache=ResultCache())
+    processor.create_views()
+    yield processor
+    connection.close_clients()
+
+
+@pytest.mark.parametrize('getter, view, column', [
+    ('get_top_rated_directors', 'top_5_directors_rated', 'average_rating'),
+    ('get_longest_average_runtime_directors', 'top_5_directors_longest_avg_runtime', 'average_runtime'),
+    ('get_top_directors_by_film_count', 'top_5_directors_most_films', 'film_count'),
+    ('get_directors_with_most_movies', 'top_5_directors_most_films', 'film_count'),
+])
+def test_getters_read_the_views(processor, getter, view, column):
+    frame = getattr(processor, getter)()
+
+    assert len(frame) == 5
+    assert frame[column].tolist() == processor.load_data(view)[column].tolist()
+
+
+def test_search_indexes_are_created_at_ingestion_not_per_lookup(processor):
+    movies = processor.db['movies']
+    assert TEXT_INDEX_NAME in movies.index_information()
+
+    movies.drop_index(TEXT_INDEX_NAME)
+    Database('films_test', URI).search()
+    assert TEXT_INDEX_NAME not in movies.index_information()
+
+
+RATINGS = [{'Rating': 7.9, 'Runtime': 90}, {'Rating': 'N/A', 'Runtime': 80},
+           {'Rating': 8.7, 'Runtime': 566}, {'Rating': 7.6}]
+
+
+class NoPercentileCollection:
+    """Collection answering the statistics aggregations like a server before MongoDB 7.0."""
+
+    def __init__(self, documents):
+        self.documents = documents
+        self.pipelines = []
+
+    def aggregate(self, pipeline):
+        if '$percentile' in str(pipeline):
+            raise OperationFailure("Invalid $group :: caused by :: Unrecognized expression '$percentile'")
+        self.pipelines.append(pipeline)
+        frame = pd.DataFrame(self.documents).apply(pd.to_numeric, errors='coerce')
+        if '$sample' in pipeline[0]:
+            return iter(self.documents)
+        group = {'_id': None}
+        for field in frame:
+            group.update({f'{field}_count': frame[field].count(), f'{field}_mean': frame[field].mean(),
+                          f'{field}_std': frame[field].std(), f'{field}_min': frame[field].min(),
+                          f'{field}_max': frame[field].max()})
+        return iter([group])
+
+
+def test_statistics_group_only_asks_for_percentiles_when_requested():
+    with_percentiles = statistics_group(['Rating'], percentiles=True)
+    without = statistics_group(['Rating'], percentiles=False)
+
+    assert with_percentiles['Rating_quartiles']['$percentile']['p'] == QUANTILES
+    assert set(with_percentiles) - set(without) == {'Rating_quartiles'}
+    assert set(without) == {'_id', 'Rating_count', 'Rating_mean', 'Rating_std', 'Rating_min', 'Rating_max'}
+
+
+def test_sampled_quartiles_ignore_values_that_are_not_numbers():
+    quartiles = sampled_quartiles(RATINGS, ['Rating', 'Runtime'])
+
+    assert quartiles['Rating_quartiles'] == pd.Series([7.9, 8.7, 7.6]).quantile(QUANTILES).tolist()
+    assert quartiles['Runtime_quartiles'] == pd.Series([90, 80, 566]).quantile(QUANTILES).tolist()
+
+
+def test_statistics_frame_drops_fields_without_numbers():
+    result = {'Rating_count': 2, 'Rating_mean': 8.0, 'Rating_std': 1.0, 'Rating_min': 7.0,
+              'Rating_quartiles': [7.5, 8.0, 8.5], 'Rating_max': 9.0, 'Title_count': 0}
+
+    frame = statistics_frame(result, ['Rating', 'Title'])
+
+    assert list(frame.columns) == ['Rating']
+    assert list(frame.index) == DESCRIBE_STATS
+    assert frame['Rating'].tolist() == [2, 8.0, 1.0, 7.0, 7.5, 8.0, 8.5, 9.0]
+    assert statistics_frame(None, ['Rating']).empty
+
+
+def test_field_statistics_fall_back_to_sampled_quartiles():
+    connection.register_client(StandInClient(), URI)
+    try:
+        processor = DataProcessor('films_test', URI)
+        processor.db = {'movies': NoPercentileCollection(RATINGS)}
+
+        stats = processor.field_statistics('movies', ['Rating', 'Runtime'])
+    finally:
+        connection.close_clients()
+
+    expected = pd.DataFrame(RATINGS).apply(pd.to_numeric, errors='coerce').describe()
+    pd.testing.assert_frame_equal(stats, expected)
+    assert '$sample' in processor.db['movies'].pipelines[1][0]
@@ -0,0 +1,48 @@
+import pandas as pd
+import pytest
+
+from app.persistence import connection
+from app.persistence.aggregates import ACTOR_STATS, DIRECTOR_STATS
+from app.persistence.data_processor import VIEW_NAMES, DataProcessor, fetch_all_query
+from app.persistence.database import Database
+from app.utilities.data_visualizer import DataVisualizer
+from benchmarks.standin import StandInClient
+
+URI = 'mongodb://test-visualizer'
+
+
+@pytest.fixture
+def client(tmp_path):
+    client = connection.register_client(StandInClient(), URI)
+    csv_file = str(tmp_path / 'movies.csv')
+    pd.read_csv('data/movies.csv', nrows=60).to_csv(csv_file, index=False)
+    Database('films_test', URI).setup_database_from_csv(csv_file, collection_name='movies', unique_key='IMDB ID')
+    yield client
+    connection.close_clients()
+
+
+def test_fetch_all_matches_the_views(client):
+    processor = DataProcessor('films_test', URI)
+    processor.create_views()
+    on_demand = DataVisualizer('films_test', URI).fetch_all()
+
+    processor.create_views(materialized=True)
+    client['films_test']['movies'].drop()  # Only the accumulators can answer now
+    materialized = DataVisualizer('films_test', URI).fetch_all()
+
+    for view in VIEW_NAMES:
+        # Ties are ordered differently by the two plans, so compare the ranked values
+        for column in on_demand[view].columns.drop(['_id', 'movies'], errors='ignore'):
+            assert on_demand[view][column].tolist() == materialized[view][column].tolist(), view
+        assert len(materialized[view]) == len(on_demand[view]) > 0
+
+
+def test_materialized_query_reads_each_view_with_a_leading_sort():
+    source, pipeline = fetch_all_query([DIRECTOR_STATS, ACTOR_STATS, 'movies'])
+
+    # $facet sub-pipelines can't use indexes, $unionWith ones can
+    assert not any('$facet' in stage for stage in pipeline)
+    assert (source, list(pipeline[0])) == (DIRECTOR_STATS, ['$sort'])
+    unions = [stage['$unionWith'] for stage in pipeline if '$unionWith' in stage]
+    assert [union['coll'] for union in unions] == [DIRECTOR_STATS, DIRECTOR_STATS, ACTOR_STATS]
+    assert all(list(union['pipeline'][0]) == ['$sort'] for union in unions)
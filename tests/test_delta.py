@@ -0,0 +1,98 @@
+import os
+
+import pandas as pd
+import pytest
+
+from app.persistence import connection
+from app.persistence.database import Database
+from app.persistence.delta import (changed_rows_mask, file_checksum, file_stat, file_unchanged, load_manifest,
+                                   row_hashes, save_manifest)
+from benchmarks.standin import StandInClient
+
+URI = 'mongodb://test-delta'
+
+
+def _chunk(titles):
+    return pd.DataFrame({'IMDB ID': [f'tt{i:07d}' for i in range(len(titles))], 'Title': titles})
+
+
+def test_row_hashes_are_keyed_and_skip_rows_without_key():
+    chunk = pd.DataFrame({'IMDB ID': ['tt0000001', None, 'tt0000001'], 'Title': ['A', 'B', 'C']})
+
+    hashes = row_hashes(chunk, 'IMDB ID')
+
+    # The last of duplicated keys wins, like the upsert that writes it
+    assert list(hashes.index) == ['tt0000001']
+    assert hashes.iloc[0] == row_hashes(chunk.iloc[[2]], 'IMDB ID').iloc[0]
+
+
+def test_changed_rows_mask_flags_new_modified_and_keyless_rows():
+    before = _chunk(['A', 'B', 'C'])
+    hashes = row_hashes(before, 'IMDB ID')
+    previous = dict(zip(hashes.index, hashes.tolist()))
+    after = pd.concat([_chunk(['A', 'B changed', 'C', 'D']),
+                       pd.DataFrame({'IMDB ID': [None], 'Title': ['No key']})], ignore_index=True)
+
+    mask = changed_rows_mask(after, row_hashes(after, 'IMDB ID'), previous, 'IMDB ID')
+
+    # A new key in the chunk must not make the unchanged rows look changed
+    assert mask.tolist() == [False, True, False, True, True]
+    assert mask.index.equals(after.index)
+
+
+def test_manifest_round_trip_and_version_mismatch(tmp_path):
+    path = str(tmp_path / 'manifest.json')
+    assert load_manifest(path) == {'version': 1, 'files': {}}
+
+    save_manifest(path, {'version': 1, 'files': {'a.csv': {'rows': {'tt0000001': 2 ** 63 + 5}}}})
+    assert load_manifest(path)['files']['a.csv']['rows']['tt0000001'] == 2 ** 63 + 5
+    assert not os.path.exists(f"{path}.tmp")
+
+    save_manifest(path, {'version': 0, 'files': {'a.csv': {}}})
+    assert load_manifest(path)['files'] == {}
+
+
+def test_file_unchanged_compares_stat_then_checksum(tmp_path):
+    path = tmp_path / 'movies.csv'
+    path.write_text('Title\nA\n')
+    stat = file_stat(str(path))
+    unchanged, checksum = file_unchanged(None, stat, str(path))
+    assert (unchanged, checksum) == (False, None)
+
+    entry = dict(stat, sha256='not computed')
+    assert file_unchanged(entry, stat, str(path)) == (True, 'not computed')
+
+    # Touched without content change: the checksum decides
+    entry = dict(stat, sha256=file_checksum(str(path)), mtime=stat['mtime'] - 1)
+    assert file_unchanged(entry, stat, str(path))[0]
+    assert not file_unchanged(dict(entry, sha256='other'), stat, str(path))[0]
+
+
+@pytest.fixture
+def database():
+    connection.register_client(StandInClient(), URI)
+    yield Database('films_test', URI)
+    connection.close_clients()
+
+
+def test_delta_ingest_writes_only_changes_and_deletes_missing(database, tmp_path):
+    movies = pd.read_csv('data/movies.csv', nrows=40)
+    csv_file = str(tmp_path / 'movies.csv')
+    movies.to_csv(csv_file, index=False)
+
+    first = database.setup_database_delta(csv_file, 'movies', 'IMDB ID', delete_missing=True)
+    stored = database.db['movies'].count_documents({})
+    assert first['rows_changed'] == len(movies) and stored > 0
+
+    # Same file: skipped without being read
+    assert database.setup_database_delta(csv_file, 'movies', 'IMDB ID')['files_skipped'] == 1
+
+    kept = database.db['movies'].find_one({}, {'IMDB ID': 1})['IMDB ID']
+    edited = movies[movies['IMDB ID'] == kept].assign(Title='Renamed')
+    edited.to_csv(csv_file, index=False)
+
+    report = database.setup_database_delta(csv_file, 'movies', 'IMDB ID', delete_missing=True)
+
+    assert report['rows_changed'] == 1 and report['rows_unchanged'] == 0
+    assert report['deleted'] == stored - 1
+    assert [movie['Title'] for movie in database.db['movies'].find()] == ['Renamed']
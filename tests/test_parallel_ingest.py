@@ -0,0 +1,156 @@
+import io
+import os
+
+import pandas as pd
+import pytest
+
+from app import cli
+from app.persistence import connection, parallel_ingest
+from app.persistence.aggregates import DIRECTOR_STATS
+from app.persistence.database import Database
+from app.persistence.parallel_ingest import find_record_starts, partition_csv, read_header
+from app.utilities.instrumentation import metrics
+from benchmarks.standin import StandInClient
+
+URI = 'mongodb://test-parallel-ingest'
+
+
+@pytest.fixture
+def csv_file(tmp_path):
+    """A CSV file whose quoted fields hold newlines, commas and escaped quotes."""
+    rows = []
+    for i in range(200):
+        summary = f'Line one of {i}\nline "two", with a comma' if i % 3 == 0 else f'Plain summary {i}'
+        rows.append({'Title': f'Movie {i}', 'Summary': summary, 'IMDB ID': f'tt{i:07d}'})
+    path = tmp_path / 'movies.csv'
+    pd.DataFrame(rows).to_csv(path, index=False)
+    return str(path)
+
+
+def _read_partitions(csv_file, partitions):
+    header = read_header(csv_file)
+    with open(csv_file, 'rb') as handle:
+        content = handle.read()
+    frames = [pd.read_csv(io.BytesIO(header + content[start:end])) for start, end in partitions]
+    return pd.concat(frames, ignore_index=True)
+
+
+@pytest.mark.parametrize('block_size', [7, 64, 1 << 20])
+@pytest.mark.parametrize('count', [1, 2, 5, 17])
+def test_partitions_round_trip_quoted_multiline_fields(csv_file, monkeypatch, block_size, count):
+    monkeypatch.setattr(parallel_ingest, 'READ_BLOCK_SIZE', block_size)
+
+    partitions = partition_csv(csv_file, count)
+
+    assert 1 <= len(partitions) <= count
+    assert all(end == start for (_, end), (start, _) in zip(partitions, partitions[1:]))
+    pd.testing.assert_frame_equal(_read_partitions(csv_file, partitions), pd.read_csv(csv_file))
+
+
+def test_record_starts_skip_newlines_inside_quotes(tmp_path):
+    path = tmp_path / 'quoted.csv'
+    path.write_bytes(b'Title,Summary\nA,"x\ny"\nB,z\n')
+    data_start = len(b'Title,Summary\n')
+
+    # A target inside the quoted value of A moves to the start of B's record
+    assert find_record_starts(str(path), data_start, [data_start + 4], path.stat().st_size) == [data_start + 8]
+
+
+def test_targets_past_the_last_record_map_to_end_of_file(tmp_path):
+    path = tmp_path / 'short.csv'
+    path.write_bytes(b'Title\nA\n')
+    size = path.stat().st_size
+
+    assert find_record_starts(str(path), 6, [7], size) == [size]
+
+
+def test_parallel_ingest_rebuilds_the_change_listeners(monkeypatch):
+    connection.register_client(StandInClient(), URI)
+    database = Database('films_test', URI)
+    database.enable_materialized_aggregates()
+
+    def ingest_parallel(path, db_name, collection_name, unique_key, **options):
+        # Workers write from other processes, where the listeners don't run
+        database.db[collection_name].insert_many([
+            {'IMDB ID': 'tt0000001', 'Title': 'Cléo', 'Director': ['Agnès Varda'], 'Cast': [], 'Rating': 7.9,
+             'Runtime': 90},
+        ])
+        return {}
+
+    monkeypatch.setattr(parallel_ingest, 'ingest_parallel', ingest_parallel)
+    try:
+        database.setup_database_parallel('movies.csv', 'movies', 'IMDB ID', workers=2)
+        assert database.db[DIRECTOR_STATS].find_one({'_id': 'Agnès Varda'})['film_count'] == 1
+    finally:
+        connection.close_clients()
+
+
+def test_delta_ingest_cannot_run_in_parallel():
+    with pytest.raises(SystemExit) as exit_info:
+        cli.main(['ingest', '--delta', '--parallel', '2'])
+    assert exit_info.value.code == 2
+
+
+@pytest.fixture
+def counting():
+    metrics.reset()
+    metrics.enable()
+    yield metrics
+    metrics.disable()
+    metrics.reset()
+
+
+def _counters():
+    return {(counter['name'], tuple(sorted(counter['labels'].items()))): counter['value']
+            for counter in metrics.snapshot()['counters']}
+
+
+def test_partitions_return_the_row_counters_they_added(csv_file, counting, monkeypatch):
+    connection.register_client(StandInClient(), URI)
+    monkeypatch.setattr(connection, 'apply_settings', lambda options: None)  # Keep the stand-in registered
+    header = read_header(csv_file)
+    task = {'csv_file': csv_file, 'header': header, 'start': len(header), 'end': os.path.getsize(csv_file),
+            'db_name': 'films_test', 'uri': URI, 'settings': {}, 'metrics': True,
+            'collection_name': 'movies', 'unique_key': 'IMDB ID', 'chunksize': 50, 'batch_size': 100,
+            'ordered': False}
+    metrics.incr('rows_read', 7)  # Counted before the partition: not part of its result
+    try:
+        result = parallel_ingest.ingest_partition(task)
+    finally:
+        connection.close_clients()
+
+    counters = {counter['name']: counter['value'] for counter in result['counters'] if not counter['labels']}
+    assert counters['rows_read'] == result['rows'] == 200
+    inserted = [counter['value'] for counter in result['counters'] if counter['name'] == 'rows_inserted']
+    assert sum(inserted) + counters.get('rows_rejected', 0) == 200
+
+
+def test_parallel_ingest_adds_the_worker_counters(csv_file, counting, monkeypatch):
+    partition = {'worker': 1, 'rows': 200, 'seconds': 1.0, 'summary': {}, 'directors': set(),
+                 'counters': [{'name': 'rows_read', 'labels': {}, 'value': 200},
+                              {'name': 'rows_inserted', 'labels': {'collection': 'movies'}, 'value': 150}]}
+
+    class Executor:
+        def __init__(self, **options):
+            pass
+
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *exc_info):
+            return False
+
+        def map(self, function, tasks):
+            return [dict(partition, counters=list(partition['counters'])) for _ in tasks]
+
+    connection.register_client(StandInClient(), URI)
+    monkeypatch.setattr(parallel_ingest, 'ProcessPoolExecutor', Executor)
+    try:
+        report = parallel_ingest.ingest_parallel(csv_file, 'films_test', 'directors', 'name', workers=2, uri=URI)
+    finally:
+        connection.close_clients()
+
+    partitions = len(report['partitions'])
+    assert partitions > 1
+    assert _counters()[('rows_read', ())] == 200 * partitions
+    assert _counters()[('rows_inserted', (('collection', 'movies'),))] == 150 * partitions
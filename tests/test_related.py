@@ -0,0 +1,38 @@
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+from app.persistence.compact import COMPACT_DTYPES, CompactMovieFrame
+from app.persistence.related import people_matrix, top_neighbours
+
+
+def test_scores_are_exact_weighted_counts_of_shared_people():
+    frame = pd.DataFrame({
+        'Title': ['Cléo', 'Le Bonheur', 'Sans toit ni loi', 'Jacquot de Nantes'],
+        'IMDB ID': ['tt0055852', 'tt0059000', 'tt0090203', 'tt0102137'],
+        'Director': [['Agnès Varda'], ['Agnès Varda'], ['Agnès Varda'], ['Jacques Demy']],
+        'Writers': [['Agnès Varda'], ['Agnès Varda'], [], ['Agnès Varda']],
+        'Cast': [['Corinne Marchand'], ['Jean-Claude Drouot'], ['Sandrine Bonnaire'], []],
+    }).reindex(columns=['Title', 'IMDB ID'] + list(COMPACT_DTYPES) + ['Director', 'Writers', 'Cast'])
+    compact = CompactMovieFrame.from_frame(frame)
+
+    neighbours = {row: (columns.tolist(), scores.tolist())
+                  for row, columns, scores in top_neighbours(people_matrix(compact.people))}
+
+    # Director (3) and writer (2) shared, then only the director, then only the writer
+    assert neighbours[0] == ([1, 2, 3], [5.0, 3.0, 2.0])
+    assert neighbours[3] == ([0, 1], [2.0, 2.0])
+
+
+def test_ties_at_the_cut_off_follow_catalog_order():
+    matrix = sparse.csr_matrix(np.ones((9, 1)))  # Every movie shares one person with every other
+
+    row, columns, scores = next(top_neighbours(matrix, rows=[0], k=3, block_size=1))
+
+    assert (row, columns.tolist(), scores.tolist()) == (0, [1, 2, 3], [1.0, 1.0, 1.0])
+
+
+def test_k_zero_keeps_no_neighbours():
+    matrix = sparse.csr_matrix(np.ones((3, 1)))
+
+    assert next(top_neighbours(matrix, k=0))[1].tolist() == []
@@ -0,0 +1,66 @@
+import os
+
+import pandas as pd
+import pytest
+
+from app.persistence import connection
+from app.persistence.aggregates import DIRECTOR_STATS, accumulators_exist
+from app.persistence.data_processor import DataProcessor
+from app.persistence.database import Database
+from benchmarks.standin import StandInClient
+
+URI = 'mongodb://test-snapshot'
+
+
+@pytest.fixture
+def database(tmp_path):
+    connection.register_client(StandInClient(), URI)
+    csv_file = str(tmp_path / 'movies.csv')
+    pd.read_csv('data/movies.csv', nrows=30).to_csv(csv_file, index=False)
+    database = Database('films_test', URI)
+    database.setup_database_from_csv(csv_file, collection_name='movies', unique_key='IMDB ID')
+    yield database
+    connection.close_clients()
+
+
+@pytest.mark.parametrize('format', ['bson', 'parquet'])
+def test_snapshot_round_trip_keeps_values_and_types(database, tmp_path, format):
+    pytest.importorskip('pyarrow')
+    projection = {'_id': 0, 'IMDB ID': 1, 'Year': 1, 'Runtime': 1, 'Rating': 1, 'Director': 1}
+    original = sorted(database.db['movies'].find({}, projection), key=lambda movie: movie['IMDB ID'])
+
+    database.export_snapshot(str(tmp_path / 'snapshot'), format=format, collections=['movies'])
+    restored_database = Database('films_restored', URI)
+    restored_database.restore_snapshot(str(tmp_path / 'snapshot'))
+    restored = sorted(restored_database.db['movies'].find({}, projection), key=lambda movie: movie['IMDB ID'])
+
+    assert restored == original
+    assert [type(movie['Runtime']) for movie in restored] == [type(movie['Runtime']) for movie in original]
+
+
+def test_materialized_views_are_restored_as_materialized(database, tmp_path):
+    processor = DataProcessor('films_test', URI)
+    processor.create_views(materialized=True)
+    expected = list(processor.db['top_5_directors_rated'].find())
+
+    manifest = database.export_snapshot(str(tmp_path / 'snapshot'))
+    restored_database = Database('films_restored', URI)
+    restored_database.restore_snapshot(str(tmp_path / 'snapshot'))
+    restored = restored_database.db
+
+    assert manifest['materialized_views']
+    assert accumulators_exist(restored.list_collection_names())
+    assert list(restored['top_5_directors_rated'].find()) == expected
+    # The view reads the accumulators, not movies
+    restored.drop_collection(DIRECTOR_STATS)
+    assert list(restored['top_5_directors_rated'].find()) == []
+
+
+def test_bson_snapshots_are_gzipped_at_the_requested_level(database, tmp_path):
+    fast = database.export_snapshot(str(tmp_path / 'fast'), collections=['movies'])
+    small = database.export_snapshot(str(tmp_path / 'small'), collections=['movies'], compresslevel=9)
+
+    def size(directory, manifest):
+        return os.path.getsize(tmp_path / directory / manifest['collections']['movies']['file'])
+
+    assert size('small', small) < size('fast', fast)
@@ -0,0 +1,53 @@
+import bson
+import pytest
+from pymongo.errors import OperationFailure
+
+from benchmarks.standin import StandInBulkBuilder, StandInClient
+
+
+@pytest.fixture
+def db():
+    db = StandInClient()['films_test']
+    db['movies'].insert_many([{'Title': title, 'Rating': rating}
+                              for title, rating in [('Cléo', 7.9), ('Jeanne', 7.6), ('Shoah', 8.7)]])
+    return db
+
+
+def test_find_raw_batches_yields_bson_batches(db):
+    batches = list(db['movies'].find_raw_batches({'Rating': {'$gt': 7.7}}, {'_id': 0, 'Title': 1}, batch_size=1))
+
+    assert [bson.decode_all(batch) for batch in batches] == [[{'Title': 'Cléo'}], [{'Title': 'Shoah'}]]
+
+
+def test_views_follow_their_source(db):
+    db.command('create', 'best', viewOn='movies', pipeline=[{"$sort": {"Rating": -1}}, {"$limit": 1}])
+    assert db['best'].find_one()['Title'] == 'Shoah'
+
+    db['movies'].insert_one({'Title': 'Sans soleil', 'Rating': 9.0})
+    assert db['best'].find_one()['Title'] == 'Sans soleil'
+
+    with pytest.raises(OperationFailure):
+        db.command('create', 'best', viewOn='movies', pipeline=[])
+    db.command('drop', 'best')
+    assert 'best' not in db.list_collection_names()
+
+
+def test_bulk_updates_accept_the_sort_option(db):
+    bulk = StandInBulkBuilder(db['movies'])
+    # pymongo 4.11+ always passes sort, which mongomock's builder rejects
+    bulk.add_update({'Title': 'Jeanne'}, {'$set': {'Rating': 8.0}}, upsert=True, sort=None)
+    bulk.execute()
+
+    assert db['movies'].find_one({'Title': 'Jeanne'})['Rating'] == 8.0
+
+
+def test_aggregate_runs_union_with_stages(db):
+    db['shorts'].insert_one({'Title': 'La Jetée', 'Rating': 8.3})
+
+    documents = db['movies'].aggregate([
+        {"$match": {"Rating": {"$gt": 8}}},
+        {"$unionWith": {"coll": 'shorts', "pipeline": [{"$project": {"_id": 0}}]}},
+        {"$project": {"_id": 0, "Title": 1}},
+    ])
+
+    assert list(documents) == [{'Title': 'Shoah'}, {'Title': 'La Jetée'}]